@@ -15,38 +15,78 @@ from dash import dcc, html
 from dash.dependencies import Input, Output
 import pandas as pd
 from pages import graficos, rankers, detalhes, marmitas, carteira, analise, lista, controle, ia, assistente_ia
-from models import global_state, carregar_ativos
-import plotly.io as pio
+from flask import request, Response
+from models import global_state, tarefa_carregamento
+from tarefas import agendar_periodicamente
+from cache_logos import registrar_rota_logos
+from cache_compartilhado import iniciar_cache
+from serializacao import CacheSerializacao, escolher_formato, escolher_codificacao, etag_corresponde, formatos_disponiveis
+from aquecimento import registrar_passo, registrar_rota_saude, aquecer_quando_escutando
+from servico_ia import registrar_rota_ia
 import pages.carteira as carteira_mod
 
-pio.templates.default = "simple_white"
-
-# Inicializar dados apenas se não estiver em ambiente de produção
-try:
-    if not os.environ.get('RAILWAY_ENVIRONMENT'):
-        print("Inicializando dados em ambiente de desenvolvimento...")
-        try:
-            carteira_mod.atualizar_precos_carteira()
-        except Exception as e:
-            print(f"Erro ao atualizar preços da carteira: {e}")
-        
-        try:
-            carteira_mod.salvar_historico()
-        except Exception as e:
-            print(f"Erro ao salvar histórico: {e}")
-except Exception as e:
-    print(f"Erro geral na inicialização: {e}")
 
+def configurar_plotly():
+    # Validar o template padrão constrói todo o plotly.graph_objs (~0,3 s): fica fora do caminho de inicialização
+    import plotly.io as pio
+    pio.templates.default = "simple_white"
 
+iniciar_cache(app.server)
+
+# Aquecimento em segundo plano, depois que o servidor já aceita conexões (estado em /health).
+# Preços e histórico da carteira só são atualizados fora do ambiente de produção.
+registrar_passo("template do plotly", configurar_plotly)
+if not os.environ.get('RAILWAY_ENVIRONMENT'):
+    registrar_passo("preços da carteira", carteira_mod.atualizar_precos_carteira)
+    registrar_passo("histórico da carteira", carteira_mod.salvar_historico)
+registrar_rota_saude(app.server)
+
+
+# ?modo=incremental ou completo (padrão); os dois modos dividem a mesma tarefa, uma execução por vez
 @app.server.route("/start_load", methods=["POST"])
 def iniciar():
-    carregar_ativos()
-    return {"status": "Carregamento iniciado"}, 202
+    modo = "incremental" if request.args.get("modo") == "incremental" else "completo"
+    iniciado = tarefa_carregamento.iniciar(modo=modo)
+    status = "Carregamento iniciado" if iniciado else "Carregamento já em andamento"
+    return {"status": status, "progresso": status_carregamento()}, 202
+
+@app.server.route("/load_status", methods=["GET"])
+def status_carregamento():
+    return {
+        **tarefa_carregamento.status(),
+        "carregando": global_state["carregando"],
+        "modo": global_state.get("modo_carregamento"),
+    }
+
+# Atualização incremental periódica (ex.: FINMA_INTERVALO_INCREMENTAL=300)
+intervalo_incremental = int(os.environ.get("FINMA_INTERVALO_INCREMENTAL", 0))
+if intervalo_incremental > 0:
+    agendar_periodicamente(tarefa_carregamento, intervalo_incremental, modo="incremental")
+
+registrar_rota_logos(app.server)
+registrar_rota_ia(app.server)
 
+cache_get_data = CacheSerializacao()
+
+# Formatos: ?formato=registros (padrão) | colunas | arrow (ou Accept: application/vnd.apache.arrow.stream)
 @app.server.route("/get_data", methods=["GET"])
 def get_data():
+    formato = escolher_formato(request.args.get("formato"), request.headers.get("Accept"))
+    if formato is None:
+        return {"erro": "Formato não suportado", "formatos": formatos_disponiveis()}, 406
+
+    versao = global_state["versao_ativos"]
     df = global_state.get("df_ativos")
-    return df.to_dict("records") if isinstance(df, pd.DataFrame) else []
+    codificacao = escolher_codificacao(request.headers.get("Accept-Encoding"))
+    mime, corpo, codificacao = cache_get_data.obter(versao, formato, codificacao, df if isinstance(df, pd.DataFrame) else None)
+
+    etag = f'"ativos-{versao}-{formato}-{codificacao or "identity"}"'
+    cabecalhos = {"ETag": etag, "Vary": "Accept, Accept-Encoding", "Cache-Control": "no-cache"}
+    if etag_corresponde(request.headers.get("If-None-Match"), etag):
+        return Response(status=304, headers=cabecalhos)
+    if codificacao:
+        cabecalhos["Content-Encoding"] = codificacao
+    return Response(corpo, mimetype=mime, headers=cabecalhos)
 
 sidebar = html.Div([
     html.H2("Finma", className="display-4"),
@@ -73,27 +113,34 @@ content = html.Div([
 
 app.layout = html.Div([sidebar, content])
 
+# Rota -> (função que monta o layout, esqueleto estático). Só a página pedida é construída;
+# layouts estáticos (sem dados nem data do dia) são montados uma vez e reaproveitados.
+ROTAS = {
+    "/": (assistente_ia.layout, False),
+    "/assistente_ia": (assistente_ia.layout, False),
+    "/detalhes": (detalhes.layout, True),
+    "/marmitas": (marmitas.layout, False),
+    "/carteira": (carteira.layout, True),
+    "/controle": (controle.layout, False),
+    "/lista": (lista.layout, True),
+    "/rankers": (rankers.layout, True),
+    "/graficos": (graficos.layout, False),
+    "/analise": (analise.layout, True),
+}
+layouts_estaticos = {}
+
+
 @app.callback(Output("page-content", "children"), [Input("url", "pathname")])
 def render_page_content(pathname):
-    telas_independentes = {
-        "/": assistente_ia.layout(),
-        "/detalhes": detalhes.layout(),
-        "/marmitas": marmitas.layout(),
-        "/carteira": carteira.layout(),
-        "/controle": controle.layout(),
-        "/assistente_ia": assistente_ia.layout(),
-    }
-    if pathname in telas_independentes:
-        return telas_independentes[pathname]
-    if pathname == "/lista":
-        return lista.layout()
-    if pathname == "/rankers":
-        return rankers.layout()
-    if pathname == "/graficos":
-        return graficos.layout()
-    if pathname == "/analise":
-        return analise.layout()
-    return html.H1("404: Página não encontrada", className="text-danger")
+    rota = ROTAS.get(pathname)
+    if rota is None:
+        return html.H1("404: Página não encontrada", className="text-danger")
+    montar_layout, estatico = rota
+    if not estatico:
+        return montar_layout()
+    if pathname not in layouts_estaticos:
+        layouts_estaticos[pathname] = montar_layout()
+    return layouts_estaticos[pathname]
 
 
 @app.callback(
@@ -143,4 +190,7 @@ if __name__ == "__main__":
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('DEBUG', 'False').lower() == 'true'
     print(f"Iniciando servidor na porta {port} com debug={debug}")
+    # Com debug o reloader do werkzeug importa o app duas vezes: só o processo filho serve e aquece
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        aquecer_quando_escutando(port)
     app.run_server(debug=debug, port=port, host='0.0.0.0')
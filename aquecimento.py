@@ -0,0 +1,76 @@
+import socket
+import threading
+import time
+
+from tarefas import Tarefa
+
+
+# Aquecimento da inicialização: tarefas lentas (cotações, histórico, template do plotly) rodam em
+# segundo plano depois que o servidor já está escutando. Enquanto isso as páginas mostram o último
+# estado gravado nos bancos.
+passos_aquecimento = []
+TIMEOUT_ESPERA_SERVIDOR = 60
+
+
+def registrar_passo(nome, funcao):
+    passos_aquecimento.append((nome, funcao))
+
+
+def aquecer(tarefa):
+    tarefa.definir_total(len(passos_aquecimento))
+    for nome, funcao in passos_aquecimento:
+        inicio = time.time()
+        try:
+            funcao()
+        except Exception as e:
+            print(f" Erro no aquecimento ({nome}): {e}")
+            tarefa.avancar(erro=f"{nome}: {e}")
+            continue
+        print(f"🔥 Aquecimento: {nome} em {time.time() - inicio:.1f}s")
+        tarefa.avancar()
+
+
+tarefa_aquecimento = Tarefa("aquecimento", aquecer)
+
+
+def iniciar_aquecimento():
+    # Roda uma única vez por processo (Tarefa.iniciar já ignora chamadas concorrentes)
+    if tarefa_aquecimento.estado["status"] == "ocioso":
+        tarefa_aquecimento.iniciar()
+
+
+def aquecer_quando_escutando(porta, host="127.0.0.1", timeout=TIMEOUT_ESPERA_SERVIDOR):
+    def esperar():
+        limite = time.time() + timeout
+        while time.time() < limite:
+            try:
+                with socket.create_connection((host, porta), timeout=1):
+                    break
+            except OSError:
+                time.sleep(0.2)
+        iniciar_aquecimento()
+
+    thread = threading.Thread(target=esperar, name="aguardar-servidor", daemon=True)
+    thread.start()
+    return thread
+
+
+def estado_saude():
+    aquecimento = tarefa_aquecimento.status()
+    # Com erro no aquecimento o app continua servindo os dados já gravados
+    pronto = aquecimento["status"] in ("concluido", "erro")
+    return {"status": "ok" if pronto else "aquecendo", "pronto": pronto, "aquecimento": aquecimento}
+
+
+def registrar_rota_saude(server):
+    @server.before_request
+    def aquecer_na_primeira_requisicao():
+        # Sob gunicorn/wsgi não há porta conhecida: o primeiro acesso (inclusive /health) dispara o aquecimento
+        iniciar_aquecimento()
+
+    @server.route("/health", methods=["GET"])
+    def saude():
+        estado = estado_saude()
+        return estado, 200 if estado["pronto"] else 503
+
+    return saude
@@ -0,0 +1,99 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date
+
+
+# Conexões SQLite compartilhadas: uma por thread e por arquivo, reaproveitadas entre chamadas.
+# Em modo WAL leitores não bloqueiam o escritor, e BEGIN IMMEDIATE evita o
+# "database is locked" ao promover uma leitura a escrita no meio da transação.
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -8000),
+    ("temp_store", "MEMORY"),
+)
+TIMEOUT_CONEXAO = 30
+STATEMENTS_EM_CACHE = 256
+
+_locais = threading.local()
+
+
+def _conexoes():
+    if not hasattr(_locais, "conexoes"):
+        _locais.conexoes = {}
+    return _locais.conexoes
+
+
+def conexao(caminho):
+    chave = os.path.abspath(caminho)
+    conexoes = _conexoes()
+    conn = conexoes.get(chave)
+    if conn is None:
+        conn = sqlite3.connect(
+            caminho,
+            timeout=TIMEOUT_CONEXAO,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=STATEMENTS_EM_CACHE,
+        )
+        for pragma, valor in PRAGMAS:
+            conn.execute(f"PRAGMA {pragma} = {valor}")
+        conexoes[chave] = conn
+    return conn
+
+
+@contextmanager
+def transacao(caminho):
+    # Transações aninhadas reaproveitam a transação externa
+    conn = conexao(caminho)
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def consultar(caminho, sql, parametros=()):
+    cursor = conexao(caminho).execute(sql, parametros)
+    try:
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def consultar_um(caminho, sql, parametros=()):
+    linhas = consultar(caminho, sql, parametros)
+    return linhas[0] if linhas else None
+
+
+def executar(caminho, sql, parametros=()):
+    with transacao(caminho) as conn:
+        cursor = conn.execute(sql, parametros)
+        return cursor.lastrowid
+
+
+def executar_varios(caminho, sql, sequencia):
+    with transacao(caminho) as conn:
+        conn.executemany(sql, sequencia)
+
+
+def intervalo_mes(mes, ano):
+    # Intervalo semiaberto [início, fim) em ISO, comparável com colunas de data indexadas
+    mes, ano = int(mes), int(ano)
+    inicio = date(ano, mes, 1)
+    fim = date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)
+    return inicio.isoformat(), fim.isoformat()
+
+
+def fechar_conexoes():
+    conexoes = _conexoes()
+    for conn in conexoes.values():
+        conn.close()
+    conexoes.clear()
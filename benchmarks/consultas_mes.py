@@ -0,0 +1,71 @@
+# Benchmark das consultas mensais de controle.py: strftime (scan completo) x intervalo indexado.
+# Uso: python benchmarks/consultas_mes.py [linhas ...]   (padrão: 10000 100000 300000)
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+# Os bancos são criados no diretório atual: roda em um diretório temporário
+os.chdir(tempfile.mkdtemp(prefix="finma_bench_"))
+
+import pandas as pd
+from banco import conexao, executar, executar_varios
+from pages import controle
+
+REPETICOES = 20
+LINHAS_POR_MES = 500
+CONSULTA_STRFTIME = """
+    SELECT id, nome, valor, pago, quem_usou, data
+    FROM cartoes
+    WHERE strftime('%m', data) = ?
+      AND strftime('%Y', data) = ?
+"""
+
+
+def popular(total):
+    # O histórico cresce em meses, não em densidade: cada mês fica com ~LINHAS_POR_MES lançamentos
+    executar(controle.FINANCEIRO_DB_PATH, "DELETE FROM cartoes")
+    inicio = date(2015, 1, 1)
+    dias = max(1, total // LINHAS_POR_MES) * 30
+    linhas = [
+        (f"gasto {i}", round(random.uniform(1, 500), 2), random.choice(["Sim", "Não"]), "Mateus",
+         (inicio + timedelta(days=random.randrange(dias))).isoformat())
+        for i in range(total)
+    ]
+    executar_varios(
+        controle.FINANCEIRO_DB_PATH,
+        "INSERT INTO cartoes (nome, valor, pago, quem_usou, data) VALUES (?, ?, ?, ?, ?)",
+        linhas
+    )
+
+
+def medir(funcao):
+    inicio = time.perf_counter()
+    for _ in range(REPETICOES):
+        resultado = funcao()
+    return (time.perf_counter() - inicio) / REPETICOES * 1000, len(resultado)
+
+
+def main(tamanhos):
+    conn = conexao(controle.FINANCEIRO_DB_PATH)
+    print(f"{'linhas':>10} {'strftime (ms)':>14} {'intervalo (ms)':>15} {'linhas do mês':>14}")
+    for total in tamanhos:
+        popular(total)
+        ms_antigo, n_antigo = medir(lambda: pd.read_sql_query(CONSULTA_STRFTIME, conn, params=["01", "2015"]).to_dict("records"))
+        ms_novo, n_novo = medir(lambda: controle.carregar_cartoes_mes_ano("01", "2015"))
+        assert n_antigo == n_novo
+        print(f"{total:>10} {ms_antigo:>14.2f} {ms_novo:>15.2f} {n_novo:>14}")
+
+    plano = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM cartoes WHERE data >= ? AND data < ?", ("2015-01-01", "2015-02-01")
+    ).fetchall()
+    print("Plano da consulta por intervalo:", plano[0][-1])
+
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or [10000, 100000, 300000])
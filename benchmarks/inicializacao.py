@@ -0,0 +1,87 @@
+# Benchmark de inicialização: tempo de "import app" e custo de importação de cada módulo (python -X importtime).
+# Uso: python benchmarks/inicializacao.py [--limite SEGUNDOS]
+# Sai com código 1 se algum módulo pesado/opcional for importado na inicialização ou se o custo
+# próprio do app (total menos as dependências base: dash, pandas, flask...) passar do limite.
+import os
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REPETICOES = 3
+LIMITE_PADRAO_SEGUNDOS = 0.5
+MAIS_CAROS = 12
+DEPENDENCIAS_BASE = ["dash", "dash_bootstrap_components", "pandas", "flask_caching", "requests"]
+PROIBIDOS_NA_INICIALIZACAO = ["yfinance", "plotly.express", "llama_cpp"]
+MODULOS_DO_PROJETO = [
+    "app", "models", "banco", "screener", "tarefas", "diferencas", "serializacao", "cache_logos",
+    "cache_cotacoes", "cache_compartilhado", "cache_respostas", "complete_b3_logos_mapping",
+]
+
+CODIGO_MEDICAO = "import time; t = time.perf_counter(); import {modulos}; print(time.perf_counter() - t)"
+
+
+def medir_importacao(modulos):
+    # Processo novo a cada medição, em diretório temporário (os bancos são criados no diretório atual).
+    # RAILWAY_ENVIRONMENT pula a atualização de preços em modo de desenvolvimento.
+    ambiente = dict(os.environ, PYTHONPATH=RAIZ, RAILWAY_ENVIRONMENT="benchmark")
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CODIGO_MEDICAO.format(modulos=", ".join(modulos))],
+        cwd=tempfile.mkdtemp(prefix="finma_bench_"), env=ambiente, capture_output=True, text=True,
+    )
+    if resultado.returncode != 0:
+        sys.exit(f"Falha ao importar {modulos}:\n{resultado.stderr[-2000:]}")
+    total = float(resultado.stdout.strip().splitlines()[-1])
+    return total, ler_importtime(resultado.stderr)
+
+
+def ler_importtime(saida):
+    # Linhas "import time: self [us] | cumulative | pacote", com a profundidade indicada pela indentação;
+    # devolve {modulo: (proprio_s, cumulativo_s, profundidade)}
+    custos = {}
+    for linha in saida.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        proprio, cumulativo, modulo = linha[len("import time:"):].split("|")
+        profundidade = (len(modulo) - len(modulo.lstrip()) - 1) // 2
+        custos[modulo.strip()] = (int(proprio) / 1e6, int(cumulativo) / 1e6, profundidade)
+    return custos
+
+
+def main(limite):
+    medicoes = [medir_importacao(["app"]) for _ in range(REPETICOES)]
+    total, custos = min(medicoes, key=lambda medicao: medicao[0])
+    base = min(medir_importacao(DEPENDENCIAS_BASE)[0] for _ in range(REPETICOES))
+    proprio_do_app = total - base
+
+    print(f"import app: {total:.3f} s (melhor de {REPETICOES})")
+    print(f"dependências base ({', '.join(DEPENDENCIAS_BASE)}): {base:.3f} s")
+    print(f"custo próprio do app: {proprio_do_app:.3f} s (limite {limite:.3f} s)")
+
+    print(f"\n{'módulo do projeto':<30} {'próprio (ms)':>13} {'cumulativo (ms)':>16}")
+    for modulo in sorted(custos, key=lambda m: -custos[m][1]):
+        if modulo in MODULOS_DO_PROJETO or modulo.startswith("pages"):
+            proprio, cumulativo, _ = custos[modulo]
+            print(f"{modulo:<30} {proprio * 1000:>13.1f} {cumulativo * 1000:>16.1f}")
+
+    # Importações feitas diretamente por app.py, com tudo que cada uma puxa
+    diretas = [modulo for modulo in custos if custos[modulo][2] == 1]
+    print(f"\n{'importados por app.py (cumulativo)':<45} {'ms':>8}")
+    for modulo in sorted(diretas, key=lambda m: -custos[m][1])[:MAIS_CAROS]:
+        print(f"{modulo:<45} {custos[modulo][1] * 1000:>8.1f}")
+
+    problemas = [f"{modulo} importado na inicialização" for modulo in PROIBIDOS_NA_INICIALIZACAO if modulo in custos]
+    if proprio_do_app > limite:
+        problemas.append(f"custo próprio do app {proprio_do_app:.3f} s acima do limite de {limite:.3f} s")
+    for problema in problemas:
+        print(f"❌ {problema}")
+    if problemas:
+        sys.exit(1)
+    print("\n✅ Inicialização dentro do orçamento")
+
+
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    limite = float(argumentos[argumentos.index("--limite") + 1]) if "--limite" in argumentos else LIMITE_PADRAO_SEGUNDOS
+    main(limite)
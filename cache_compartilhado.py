@@ -0,0 +1,76 @@
+import os
+import tempfile
+from functools import wraps
+
+from flask_caching import Cache
+
+
+# Cache de resultados ligado ao servidor Flask do Dash (flask_caching), com backend escolhido por ambiente:
+#   FINMA_CACHE_TIPO=SimpleCache      memória do processo (padrão)
+#   FINMA_CACHE_TIPO=FileSystemCache  diretório FINMA_CACHE_DIR, compartilhado pelos workers do gunicorn
+#   FINMA_CACHE_TIPO=RedisCache       FINMA_CACHE_REDIS_URL (Redis ou qualquer servidor compatível)
+TIMEOUT_PADRAO_CACHE = int(os.environ.get("FINMA_CACHE_TIMEOUT", 300))
+
+
+def configuracao_cache():
+    tipo = os.environ.get("FINMA_CACHE_TIPO", "SimpleCache")
+    config = {
+        "CACHE_TYPE": tipo,
+        "CACHE_DEFAULT_TIMEOUT": TIMEOUT_PADRAO_CACHE,
+        "CACHE_KEY_PREFIX": "finma_",
+    }
+    if tipo == "FileSystemCache":
+        config["CACHE_DIR"] = os.environ.get("FINMA_CACHE_DIR", os.path.join(tempfile.gettempdir(), "finma_cache"))
+        config["CACHE_THRESHOLD"] = 2000
+    elif tipo == "RedisCache":
+        config["CACHE_REDIS_URL"] = os.environ.get("FINMA_CACHE_REDIS_URL", "redis://localhost:6379/0")
+    return config
+
+
+cache = Cache(config=configuracao_cache())
+
+# grupo -> funções memoizadas que dependem dos dados do grupo ("carteira", "fundamentos", ...)
+dependentes = {}
+
+
+def iniciar_cache(server):
+    cache.init_app(server)
+    print(f"🗄️ Cache de resultados: {cache.config['CACHE_TYPE']}")
+
+
+def cache_ativo():
+    return getattr(cache, "app", None) is not None
+
+
+def memoizar(timeout=None, grupos=()):
+    # A chave vem do nome da função e dos argumentos; sem servidor (scripts, benchmarks) chama direto
+    def decorador(funcao):
+        memoizada = cache.memoize(timeout=timeout)(funcao)
+
+        @wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            if not cache_ativo():
+                return funcao(*args, **kwargs)
+            return memoizada(*args, **kwargs)
+
+        envoltorio.memoizada = memoizada
+        for grupo in grupos:
+            dependentes.setdefault(grupo, []).append(envoltorio)
+        return envoltorio
+
+    return decorador
+
+
+def invalidar(*funcoes):
+    if not cache_ativo():
+        return
+    for funcao in funcoes:
+        try:
+            cache.delete_memoized(funcao.memoizada)
+        except Exception as e:
+            print(f" Erro ao invalidar cache de {funcao.__name__}: {e}")
+
+
+def invalidar_grupo(grupo):
+    # Chamado depois das escritas: descarta tudo que foi calculado a partir dos dados do grupo
+    invalidar(*dependentes.get(grupo, ()))
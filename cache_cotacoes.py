@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+
+# Cache de cotações/informações do Yahoo compartilhado por todo o processo (models, carteira, detalhes).
+# Cada tipo de dado tem um TTL com o pregão aberto e outro, mais longo, com a B3 fechada.
+TTLS = {
+    "info": (5 * 60, 6 * 60 * 60),
+    "historico": (15 * 60, 12 * 60 * 60),
+    "dividendos": (6 * 60 * 60, 24 * 60 * 60),
+}
+MAX_ITENS_CACHE = 1024
+
+# Pregão regular da B3 (horário de Brasília, sem horário de verão desde 2019), sem considerar feriados
+FUSO_B3 = timezone(timedelta(hours=-3))
+ABERTURA_B3 = 10
+FECHAMENTO_B3 = 18
+
+
+def b3_aberta(agora=None):
+    agora = agora or datetime.now(FUSO_B3)
+    return agora.weekday() < 5 and ABERTURA_B3 <= agora.hour < FECHAMENTO_B3
+
+
+def segundos_ate_abertura(agora=None):
+    agora = agora or datetime.now(FUSO_B3)
+    abertura = agora.replace(hour=ABERTURA_B3, minute=0, second=0, microsecond=0)
+    if agora >= abertura:
+        abertura += timedelta(days=1)
+    while abertura.weekday() >= 5:
+        abertura += timedelta(days=1)
+    return (abertura - agora).total_seconds()
+
+
+def negociado_24h(ticker):
+    # Criptomoedas e câmbio não seguem o pregão da B3
+    return ticker.endswith("-USD") or ticker.endswith("=X")
+
+
+def ttl_para(tipo, ticker, agora=None):
+    ttl_aberto, ttl_fechado = TTLS[tipo]
+    if negociado_24h(ticker) or b3_aberta(agora):
+        return ttl_aberto
+    # Com o mercado fechado o dado vale até a próxima abertura, limitado ao TTL de mercado fechado
+    return max(ttl_aberto, min(ttl_fechado, segundos_ate_abertura(agora)))
+
+
+class _Busca:
+    def __init__(self):
+        self.evento = threading.Event()
+        self.valor = None
+        self.erro = None
+
+
+class CacheCotacoes:
+    # LRU limitado, com uma única busca por chave em andamento (single-flight)
+
+    def __init__(self, max_itens=MAX_ITENS_CACHE):
+        self.max_itens = max_itens
+        self.lock = threading.Lock()
+        self.itens = OrderedDict()
+        self.buscas = {}
+        self.contadores = {"acertos": 0, "falhas": 0, "compartilhadas": 0, "erros": 0, "removidos": 0}
+
+    def obter(self, tipo, ticker, carregar, *parametros):
+        chave = (tipo, ticker, parametros)
+        with self.lock:
+            item = self.itens.get(chave)
+            if item is not None and item[0] > time.time():
+                self.itens.move_to_end(chave)
+                self.contadores["acertos"] += 1
+                return item[1]
+            self.contadores["falhas"] += 1
+            busca = self.buscas.get(chave)
+            lider = busca is None
+            if lider:
+                busca = self.buscas[chave] = _Busca()
+            else:
+                self.contadores["compartilhadas"] += 1
+
+        if not lider:
+            busca.evento.wait()
+            if busca.erro is not None:
+                raise busca.erro
+            return busca.valor
+
+        try:
+            busca.valor = carregar()
+        except Exception as e:
+            busca.erro = e
+            with self.lock:
+                self.contadores["erros"] += 1
+                del self.buscas[chave]
+            busca.evento.set()
+            raise
+
+        with self.lock:
+            self.itens[chave] = (time.time() + ttl_para(tipo, ticker), busca.valor)
+            self.itens.move_to_end(chave)
+            while len(self.itens) > self.max_itens:
+                self.itens.popitem(last=False)
+                self.contadores["removidos"] += 1
+            del self.buscas[chave]
+        busca.evento.set()
+        return busca.valor
+
+    def invalidar(self, ticker=None):
+        with self.lock:
+            if ticker is None:
+                self.itens.clear()
+                return
+            for chave in [chave for chave in self.itens if chave[1] == ticker]:
+                del self.itens[chave]
+
+    def estatisticas(self):
+        with self.lock:
+            estatisticas = dict(self.contadores, itens=len(self.itens), buscas_em_andamento=len(self.buscas))
+        consultas = estatisticas["acertos"] + estatisticas["falhas"]
+        estatisticas["taxa_acerto"] = round(estatisticas["acertos"] / consultas, 3) if consultas else None
+        return estatisticas
+
+
+cache_cotacoes = CacheCotacoes()
+
+
+def normalizar(ticker):
+    return (ticker or "").strip().upper()
+
+
+def ticker_yahoo(ticker):
+    # yfinance só é importado na primeira busca de fato (a importação custa quase um segundo)
+    import yfinance as yf
+    return yf.Ticker(ticker)
+
+
+# As funções abaixo devolvem cópias: quem chama pode alterar o resultado sem mexer no cache.
+# O limitador (ex.: limitador_yahoo de models) só é acionado quando a busca vai de fato ao Yahoo.
+def obter_info(ticker, limitador=None):
+    ticker = normalizar(ticker)
+
+    def carregar():
+        if limitador is not None:
+            limitador.adquirir()
+        return ticker_yahoo(ticker).info or {}
+
+    return dict(cache_cotacoes.obter("info", ticker, carregar))
+
+
+def obter_historico(ticker, **parametros):
+    ticker = normalizar(ticker)
+    historico = cache_cotacoes.obter(
+        "historico", ticker, lambda: ticker_yahoo(ticker).history(**parametros), *sorted(parametros.items())
+    )
+    return historico.copy()
+
+
+def obter_dividendos(ticker):
+    ticker = normalizar(ticker)
+    return cache_cotacoes.obter("dividendos", ticker, lambda: ticker_yahoo(ticker).dividends).copy()
@@ -0,0 +1,159 @@
+import hashlib
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from html import escape
+
+import requests
+from flask import Response, request
+
+from banco import consultar, consultar_um, executar
+from complete_b3_logos_mapping import COMPLETE_B3_LOGOS_MAPPING, get_logo_url, normalize_ticker
+
+
+LOGO_CACHE_DB_PATH = 'logo_cache.db'
+TIMEOUT_DOWNLOAD_LOGO = 10
+TTL_LOGO_AUSENTE = 24 * 60 * 60
+MAX_WORKERS_PREFETCH = 8
+MAX_AGE_LOGO = 7 * 24 * 60 * 60
+MAX_AGE_PLACEHOLDER = 60 * 60
+
+PLACEHOLDER_SVG = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="100" height="100" viewBox="0 0 100 100">'
+    '<defs><linearGradient id="g" x1="0" y1="0" x2="1" y2="1">'
+    '<stop offset="0%" stop-color="#667eea"/><stop offset="100%" stop-color="#764ba2"/>'
+    '</linearGradient></defs>'
+    '<rect width="100" height="100" rx="16" fill="url(#g)"/>'
+    '<text x="50" y="50" dy=".35em" text-anchor="middle" font-family="Segoe UI, sans-serif" '
+    'font-size="26" font-weight="bold" fill="white">{texto}</text></svg>'
+)
+
+
+def criar_tabela_logos():
+    executar(LOGO_CACHE_DB_PATH, '''
+        CREATE TABLE IF NOT EXISTS logos (
+            ticker TEXT PRIMARY KEY,
+            encontrado INTEGER NOT NULL,
+            content_type TEXT,
+            imagem BLOB,
+            hash TEXT,
+            atualizado_em REAL NOT NULL
+        )
+    ''')
+
+
+criar_tabela_logos()
+
+
+def salvar_logo(ticker, imagem=None, content_type=None):
+    encontrado = imagem is not None
+    hash_imagem = hashlib.sha1(imagem).hexdigest() if encontrado else None
+    executar(LOGO_CACHE_DB_PATH, '''
+        INSERT INTO logos (ticker, encontrado, content_type, imagem, hash, atualizado_em)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(ticker) DO UPDATE SET
+            encontrado = excluded.encontrado, content_type = excluded.content_type,
+            imagem = excluded.imagem, hash = excluded.hash, atualizado_em = excluded.atualizado_em
+    ''', (ticker, int(encontrado), content_type, imagem, hash_imagem, time.time()))
+
+
+def carregar_logo(ticker):
+    return consultar_um(
+        LOGO_CACHE_DB_PATH,
+        'SELECT encontrado, content_type, imagem, hash, atualizado_em FROM logos WHERE ticker = ?',
+        (ticker,)
+    )
+
+
+def baixar_logo(ticker, url=None):
+    # (None, None) só quando a imagem de fato não existe (404/410 ou resposta que não é imagem).
+    # Falhas de rede, 5xx e afins sobem como requests.RequestException: não dizem nada sobre o logo
+    url = url or get_logo_url(ticker)
+    if not url:
+        return None, None
+    resposta = requests.get(url, timeout=TIMEOUT_DOWNLOAD_LOGO)
+    if resposta.status_code in (404, 410):
+        return None, None
+    resposta.raise_for_status()
+    content_type = resposta.headers.get('Content-Type', '').split(';')[0].strip()
+    if resposta.status_code != 200 or not content_type.startswith('image/') or not resposta.content:
+        return None, None
+    return resposta.content, content_type
+
+
+def atualizar_logo(ticker, url=None):
+    # Devolve True (logo salvo), False (ausência salva por TTL_LOGO_AUSENTE) ou None (falha temporária,
+    # nada é salvo e a próxima consulta tenta de novo)
+    ticker = normalize_ticker(ticker)
+    try:
+        imagem, content_type = baixar_logo(ticker, url)
+    except requests.RequestException as e:
+        print(f" Erro ao baixar logo de {ticker}: {e}")
+        return None
+    salvar_logo(ticker, imagem, content_type)
+    return imagem is not None
+
+
+def obter_logo(ticker, baixar_se_ausente=True):
+    # Retorna (content_type, imagem, hash) do cache local ou None se não houver logo
+    ticker = normalize_ticker(ticker)
+    if not ticker:
+        return None
+    linha = carregar_logo(ticker)
+    if linha is None or (not linha[0] and time.time() - linha[4] > TTL_LOGO_AUSENTE):
+        if not baixar_se_ausente or get_logo_url(ticker) is None:
+            return None
+        atualizar_logo(ticker)
+        linha = carregar_logo(ticker)
+    if linha is None or not linha[0]:
+        return None
+    return linha[1], linha[2], linha[3]
+
+
+def placeholder_logo(ticker):
+    texto = normalize_ticker(ticker)[:4] or '?'
+    svg = PLACEHOLDER_SVG.format(texto=escape(texto))
+    return svg.encode('utf-8'), hashlib.sha1(svg.encode('utf-8')).hexdigest()
+
+
+def prefetch_logos(tickers=None, forcar=False, max_workers=MAX_WORKERS_PREFETCH):
+    tickers = sorted({normalize_ticker(t) for t in (tickers or COMPLETE_B3_LOGOS_MAPPING)})
+    if not forcar:
+        ja_baixados = {linha[0] for linha in consultar(LOGO_CACHE_DB_PATH, 'SELECT ticker FROM logos WHERE encontrado = 1')}
+        tickers = [t for t in tickers if t not in ja_baixados]
+
+    print(f"🔄 Baixando {len(tickers)} logos...")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        resultados = list(executor.map(atualizar_logo, tickers))
+    baixados = resultados.count(True)
+    falhas = resultados.count(None)
+    print(f" {baixados} logos salvos, {len(tickers) - baixados - falhas} sem imagem, {falhas} com falha de download.")
+    return baixados
+
+
+def registrar_rota_logos(server):
+    @server.route("/logos/<ticker>")
+    def servir_logo(ticker):
+        logo = obter_logo(ticker)
+        if logo is not None:
+            content_type, imagem, hash_imagem = logo
+            max_age = MAX_AGE_LOGO
+        else:
+            # Sem imagem: placeholder em gradiente, com validade curta para pegar o logo quando existir
+            imagem, hash_imagem = placeholder_logo(ticker)
+            content_type = 'image/svg+xml'
+            max_age = MAX_AGE_PLACEHOLDER
+
+        etag = f'"{hash_imagem}"'
+        cabecalhos = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+        if request.headers.get("If-None-Match") == etag:
+            return Response(status=304, headers=cabecalhos)
+        return Response(imagem, mimetype=content_type, headers=cabecalhos)
+
+    return servir_logo
+
+
+# Pré-carregamento em lote: python cache_logos.py [--forcar] [TICKER ...]
+if __name__ == "__main__":
+    argumentos = [a for a in sys.argv[1:] if a != '--forcar']
+    prefetch_logos(argumentos or None, forcar='--forcar' in sys.argv[1:])
@@ -0,0 +1,189 @@
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from banco import executar, executar_varios, consultar
+
+
+# Cache de respostas do assistente, usado pelo processo de servico_ia.py. A chave é a pergunta
+# normalizada mais a versão do contexto financeiro (hash do prefixo do prompt): se o contexto muda,
+# as respostas antigas deixam de valer. Perguntas quase iguais ("O que é o Ibovespa?" / "o que e
+# ibovespa") podem ser encontradas por similaridade de trigramas de caracteres (desligado por padrão).
+MAX_RESPOSTAS_CACHE = int(os.environ.get("FINMA_IA_CACHE_RESPOSTAS", 256))
+# Vazio: só em memória. Com um caminho, as respostas sobrevivem a reinícios do serviço
+CACHE_RESPOSTAS_DB_PATH = os.environ.get("FINMA_IA_CACHE_ARQUIVO", "")
+# 1 (padrão): só a pergunta normalizada idêntica conta. Abaixo de 1 (ex.: 0.8) ativa a busca por parecidas
+SIMILARIDADE_MINIMA = float(os.environ.get("FINMA_IA_SIMILARIDADE", 1))
+
+# Palavras que mudam o sentido da pergunta mesmo com o resto do texto igual
+MESES = {
+    "janeiro", "fevereiro", "marco", "abril", "maio", "junho",
+    "julho", "agosto", "setembro", "outubro", "novembro", "dezembro",
+}
+NEGACOES = {"nao", "nunca", "sem", "nem", "jamais", "nenhum", "nenhuma"}
+
+
+def normalizar_pergunta(pergunta):
+    texto = unicodedata.normalize("NFKD", (pergunta or "").lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(re.findall(r"[a-z0-9]+", texto))
+
+
+def trigramas(texto):
+    texto = f" {texto} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def termos_exatos(pergunta):
+    # Termos que precisam coincidir entre perguntas parecidas: tickers e números ("PETR3" x "PETR4"),
+    # meses, negações e nomes próprios (inicial maiúscula fora do começo da frase: "Maria" x "Mariana")
+    termos = {
+        palavra for palavra in normalizar_pergunta(pergunta).split()
+        if any(c.isdigit() for c in palavra) or palavra in MESES or palavra in NEGACOES
+    }
+    anterior = "."
+    for palavra in (pergunta or "").split():
+        limpa = palavra.strip(".,;:!?¿¡()\"'")
+        if limpa[:1].isupper() and anterior[-1:] not in ".?!":
+            termos.add(normalizar_pergunta(limpa))
+        anterior = palavra
+    return frozenset(termos)
+
+
+class CacheRespostas:
+    # LRU limitado; o índice de trigramas é separado por versão do contexto
+
+    def __init__(self, max_itens=MAX_RESPOSTAS_CACHE, caminho=CACHE_RESPOSTAS_DB_PATH,
+                 similaridade_minima=SIMILARIDADE_MINIMA):
+        self.max_itens = max_itens
+        self.caminho = caminho
+        self.similaridade_minima = similaridade_minima
+        self.lock = threading.Lock()
+        self.itens = OrderedDict()
+        self.termos = {}
+        self.indice = {}
+        self.contadores = {"acertos": 0, "acertos_similares": 0, "falhas": 0, "removidos": 0}
+        if self.caminho:
+            self.carregar_do_disco()
+
+    def carregar_do_disco(self):
+        executar(self.caminho, '''
+            CREATE TABLE IF NOT EXISTS respostas_ia (
+                versao TEXT NOT NULL,
+                pergunta TEXT NOT NULL,
+                resposta TEXT NOT NULL,
+                criado_em REAL NOT NULL,
+                termos TEXT,
+                PRIMARY KEY (versao, pergunta)
+            )
+        ''')
+        colunas = {linha[1] for linha in consultar(self.caminho, "PRAGMA table_info(respostas_ia)")}
+        if "termos" not in colunas:
+            executar(self.caminho, "ALTER TABLE respostas_ia ADD COLUMN termos TEXT")
+        linhas = consultar(self.caminho, "SELECT versao, pergunta, resposta, termos FROM respostas_ia ORDER BY criado_em")
+        # Sem a pergunta original, linhas antigas só guardam os termos que a forma normalizada preserva
+        removidas = self.guardar_em_memoria([
+            ((versao, pergunta), resposta, frozenset(termos.split()) if termos is not None else termos_exatos(pergunta))
+            for versao, pergunta, resposta, termos in linhas
+        ])
+        self.apagar_do_disco(removidas)
+
+    def guardar_em_memoria(self, itens):
+        removidas = []
+        with self.lock:
+            for chave, resposta, termos in itens:
+                if chave not in self.itens:
+                    self.indexar(chave)
+                self.itens[chave] = resposta
+                self.termos[chave] = termos
+                self.itens.move_to_end(chave)
+            while len(self.itens) > self.max_itens:
+                antiga, _ = self.itens.popitem(last=False)
+                del self.termos[antiga]
+                self.desindexar(antiga)
+                self.contadores["removidos"] += 1
+                removidas.append(antiga)
+        return removidas
+
+    def apagar_do_disco(self, chaves):
+        if self.caminho and chaves:
+            executar_varios(self.caminho, "DELETE FROM respostas_ia WHERE versao = ? AND pergunta = ?", chaves)
+
+    def indexar(self, chave):
+        versao, pergunta = chave
+        indice = self.indice.setdefault(versao, {})
+        for trigrama in trigramas(pergunta):
+            indice.setdefault(trigrama, set()).add(pergunta)
+
+    def desindexar(self, chave):
+        versao, pergunta = chave
+        indice = self.indice.get(versao, {})
+        for trigrama in trigramas(pergunta):
+            perguntas = indice.get(trigrama)
+            if perguntas is not None:
+                perguntas.discard(pergunta)
+                if not perguntas:
+                    del indice[trigrama]
+        if not indice:
+            self.indice.pop(versao, None)
+
+    def mais_parecida(self, versao, pergunta, exatos):
+        # Similaridade de Jaccard entre os trigramas, só entre candidatas que dividem algum trigrama
+        indice = self.indice.get(versao)
+        if not indice or self.similaridade_minima >= 1:
+            return None
+        meus = trigramas(pergunta)
+        candidatas = {}
+        for trigrama in meus:
+            for outra in indice.get(trigrama, ()):
+                candidatas[outra] = candidatas.get(outra, 0) + 1
+        melhor, melhor_nota = None, self.similaridade_minima
+        for outra, em_comum in candidatas.items():
+            nota = em_comum / (len(meus) + len(trigramas(outra)) - em_comum)
+            if nota >= melhor_nota and self.termos[(versao, outra)] == exatos:
+                melhor, melhor_nota = outra, nota
+        return melhor
+
+    def obter(self, versao, pergunta):
+        exatos = termos_exatos(pergunta)
+        pergunta = normalizar_pergunta(pergunta)
+        if not pergunta:
+            return None
+        with self.lock:
+            chave = (versao, pergunta)
+            if chave not in self.itens:
+                parecida = self.mais_parecida(versao, pergunta, exatos)
+                if parecida is None:
+                    self.contadores["falhas"] += 1
+                    return None
+                chave = (versao, parecida)
+                self.contadores["acertos_similares"] += 1
+            else:
+                self.contadores["acertos"] += 1
+            self.itens.move_to_end(chave)
+            return self.itens[chave]
+
+    def guardar(self, versao, pergunta, resposta):
+        termos = termos_exatos(pergunta)
+        pergunta = normalizar_pergunta(pergunta)
+        if not pergunta or not resposta:
+            return
+        removidas = self.guardar_em_memoria([((versao, pergunta), resposta, termos)])
+        if self.caminho:
+            executar(self.caminho, '''
+                INSERT INTO respostas_ia (versao, pergunta, resposta, criado_em, termos) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(versao, pergunta) DO UPDATE SET
+                    resposta = excluded.resposta, criado_em = excluded.criado_em, termos = excluded.termos
+            ''', (versao, pergunta, resposta, time.time(), " ".join(sorted(termos))))
+            self.apagar_do_disco(removidas)
+
+    def estatisticas(self):
+        with self.lock:
+            estatisticas = dict(self.contadores, itens=len(self.itens))
+        consultas = estatisticas["acertos"] + estatisticas["acertos_similares"] + estatisticas["falhas"]
+        acertos = estatisticas["acertos"] + estatisticas["acertos_similares"]
+        estatisticas["taxa_acerto"] = round(acertos / consultas, 3) if consultas else None
+        return estatisticas
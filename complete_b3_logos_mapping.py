@@ -2,6 +2,10 @@
 # Token público de demonstração: pk_Dhx4NNGHRFe5mo7gEtJaWA
 # Gerado automaticamente a partir da lista em models.py
 
+import os
+from functools import lru_cache
+from html import escape
+
 COMPLETE_B3_LOGOS_MAPPING = {
 
     # A - A
@@ -975,39 +979,68 @@ COMPLETE_B3_LOGOS_MAPPING = {
 }
 
 
+def normalize_ticker(ticker):
+    # "petr4", "PETR4.SA" e "petr4.sa" viram a mesma chave: "PETR4"
+    if not ticker:
+        return ''
+    ticker = str(ticker).strip().upper()
+    if ticker.endswith('.SA'):
+        ticker = ticker[:-3]
+    return ticker
+
+
+# Índice construído uma única vez na importação: lookup O(1) por ticker normalizado
+LOGO_INDEX = {normalize_ticker(key): url for key, url in COMPLETE_B3_LOGOS_MAPPING.items()}
+
+
 def get_logo_url(ticker):
-   
+
     if not ticker:
         return None
-    
 
-    ticker_normalized = ticker.lower()
-    
+    return LOGO_INDEX.get(normalize_ticker(ticker))
+
 
-    for key, url in COMPLETE_B3_LOGOS_MAPPING.items():
-        if key.lower() == ticker_normalized:
-            return url
-    
-    return None
+# Logos servidos pelo próprio servidor (cache_logos.py); FINMA_LOGOS_LOCAIS=0 volta a usar o logo.dev direto
+USE_LOCAL_LOGOS = os.environ.get('FINMA_LOGOS_LOCAIS', '1') != '0'
+LOCAL_LOGO_ROUTE = '/logos/{ticker}'
 
-def add_logo_column_to_data(data, ticker_column='ticker'):
 
+def get_logo_src(ticker):
+
+    logo_url = get_logo_url(ticker)
+    if logo_url and USE_LOCAL_LOGOS:
+        return LOCAL_LOGO_ROUTE.format(ticker=normalize_ticker(ticker))
+    return logo_url
+
+LOGO_SIZES = ('sm', 'md', 'lg')
+
+LOGO_CELL_TEMPLATE = '<div class="logo-cell logo-{size}"><img class="logo-img" src="{url}" alt="{ticker}"><span class="logo-ticker">{ticker}</span></div>'
+LOGO_PLACEHOLDER_TEMPLATE = '<div class="logo-cell logo-{size}"><div class="logo-placeholder">{short}</div><span class="logo-ticker">{ticker}</span></div>'
+
+
+@lru_cache(maxsize=4096)
+def render_logo_cell(ticker, size='md'):
+    # HTML da célula (logo + ticker); o visual fica nas classes de assets/custom_logos.css
+    if size not in LOGO_SIZES:
+        size = 'md'
+    ticker = str(ticker or '')
+    logo_url = get_logo_src(ticker)
+    if logo_url:
+        return LOGO_CELL_TEMPLATE.format(size=size, url=escape(logo_url), ticker=escape(ticker))
+    ticker_short = ticker.replace('.SA', '').replace('.sa', '')[:4]
+    return LOGO_PLACEHOLDER_TEMPLATE.format(size=size, short=escape(ticker_short), ticker=escape(ticker))
+
+
+def add_logo_column_to_data(data, ticker_column='ticker', size='md'):
+    # Retorna novas linhas; os registros recebidos não são alterados
     if not data:
         return data
-    
-    for row in data:
-        ticker = row.get(ticker_column, '')
-        logo_url = get_logo_url(ticker)
-        
-        if logo_url:
-
-            row['ticker'] = f'<div style="display: flex; align-items: center; gap: 8px;"><img src="{logo_url}" alt="{ticker}" style="width: 50px; height: 50px; border-radius: 8px; object-fit: contain; border: 1px solid #e0e0e0; background: white; padding: 3px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);"><span style="font-weight: bold; font-size: 14px;">{ticker}</span></div>'
-        else:
-
-            ticker_short = ticker.replace('.SA', '').replace('.sa', '')[:4]
-            row['ticker'] = f'<div style="display: flex; align-items: center; gap: 8px;"><div style="width: 50px; height: 50px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); border-radius: 8px; display: flex; align-items: center; justify-content: center; font-size: 14px; font-weight: bold; color: white; text-shadow: 1px 1px 2px rgba(0,0,0,0.3);">{ticker_short}</div><span style="font-weight: bold; font-size: 14px;">{ticker}</span></div>'
-    
-    return data
+
+    return [
+        {**row, ticker_column: render_logo_cell(row.get(ticker_column, ''), size)}
+        for row in data
+    ]
 
 def get_table_columns_with_logo(base_columns):
 
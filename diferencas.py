@@ -0,0 +1,81 @@
+from collections import namedtuple
+
+from banco import transacao
+
+
+# Diferença entre o estado anterior e o atual de uma DataTable editável, indexada pela chave (id)
+Diferenca = namedtuple("Diferenca", ["inseridos", "atualizados", "removidos"])
+
+
+def valores_iguais(antigo, novo, conversor=None):
+    if conversor is not None:
+        try:
+            return conversor(antigo) == conversor(novo)
+        except (TypeError, ValueError):
+            pass
+    return antigo == novo
+
+
+def diferenca_tabelas(anteriores, atuais, colunas=(), conversores=None, chave="id"):
+    # Uma passada em cada lista: O(n) em vez de procurar cada linha na tabela anterior
+    if atuais is None:
+        return Diferenca([], [], [])
+    conversores = conversores or {}
+    antes = {linha[chave]: linha for linha in anteriores or [] if linha.get(chave) is not None}
+    inseridos, atualizados, vistos = [], [], set()
+    for linha in atuais:
+        id_linha = linha.get(chave)
+        antiga = antes.get(id_linha) if id_linha is not None else None
+        if antiga is None:
+            inseridos.append(linha)
+            continue
+        vistos.add(id_linha)
+        if any(not valores_iguais(antiga.get(coluna), linha.get(coluna), conversores.get(coluna)) for coluna in colunas):
+            atualizados.append(linha)
+    removidos = [id_linha for id_linha in antes if id_linha not in vistos]
+    return Diferenca(inseridos, atualizados, removidos)
+
+
+def propriedades_disparadas():
+    from dash import callback_context
+    return callback_context.triggered_prop_ids
+
+
+def edicao_da_tabela(id_tabela):
+    # data_previous só muda quando o usuário edita a tabela, mas continua com esse último valor quando
+    # o servidor troca data (filtro de mês, botão de adicionar). Comparar nesses casos apagaria as linhas
+    # do mês anterior: o diff só vale quando a própria edição disparou o callback
+    return f"{id_tabela}.data_previous" in propriedades_disparadas()
+
+
+def valores_convertidos(linha, colunas, conversores):
+    valores = []
+    for coluna in colunas:
+        valor = linha.get(coluna)
+        conversor = conversores.get(coluna)
+        if conversor is not None and valor is not None:
+            valor = conversor(valor)
+        valores.append(valor)
+    return valores
+
+
+def aplicar_diferenca(caminho, tabela, diferenca, colunas=(), conversores=None, chave="id", inserir=False):
+    # Remoções e atualizações (e inserções, se pedido) em uma única transação, com executemany
+    conversores = conversores or {}
+    colunas = list(colunas)
+    with transacao(caminho) as conn:
+        if diferenca.removidos:
+            conn.executemany(
+                f"DELETE FROM {tabela} WHERE {chave} = ?",
+                [(id_linha,) for id_linha in diferenca.removidos]
+            )
+        if diferenca.atualizados and colunas:
+            conn.executemany(
+                f"UPDATE {tabela} SET {', '.join(f'{coluna} = ?' for coluna in colunas)} WHERE {chave} = ?",
+                [(*valores_convertidos(linha, colunas, conversores), linha[chave]) for linha in diferenca.atualizados]
+            )
+        if inserir and diferenca.inseridos and colunas:
+            conn.executemany(
+                f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({', '.join('?' * len(colunas))})",
+                [valores_convertidos(linha, colunas, conversores) for linha in diferenca.inseridos]
+            )
@@ -1,12 +1,19 @@
 import threading
 import pandas as pd
-import yfinance as yf
-from flask import Flask
-from flask_caching import Cache
 import time
 import sqlite3
+import os
+import json
+import hashlib
+import random
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import bcrypt
+from screener import filtrar_ativos
+from tarefas import Tarefa
+from banco import transacao, consultar, consultar_um, executar, executar_varios
+from cache_cotacoes import obter_info
+from cache_compartilhado import memoizar, invalidar_grupo
 
 
 LISTA_ACOES = [
@@ -1234,28 +1241,93 @@ carregamento_em_andamento = False
 lock = threading.Lock()  
 
 
-cache = Cache(config={'CACHE_TYPE': 'SimpleCache'})
-
-
 import threading
 import pandas as pd
-import yfinance as yf
 
-global_state = {"df_ativos": None, "carregando": False}
+global_state = {"df_ativos": None, "carregando": False, "versao_ativos": 0, "modo_carregamento": None}
+
+
+def publicar_ativos(df_ativos):
+    # A versão identifica o snapshot servido em /get_data (usada no ETag)
+    global_state["df_ativos"] = df_ativos
+    global_state["versao_ativos"] += 1
+
+
+MAX_WORKERS_COLETA = int(os.environ.get("FINMA_MAX_WORKERS", 8))
+REQUISICOES_POR_SEGUNDO = float(os.environ.get("FINMA_REQ_POR_SEGUNDO", 5))
+BACKOFF_BASE_SEGUNDOS = float(os.environ.get("FINMA_BACKOFF_BASE", 2))
+BACKOFF_MAXIMO_SEGUNDOS = 60
+
+
+class LimitadorTaxa:
+    # Token bucket compartilhado entre as threads de coleta
+
+    def __init__(self, taxa, capacidade=None):
+        self.taxa = taxa
+        self.capacidade = capacidade or max(1, int(taxa))
+        self.tokens = float(self.capacidade)
+        self.ultimo = time.monotonic()
+        self.lock = threading.Lock()
+
+    def adquirir(self):
+        while True:
+            with self.lock:
+                agora = time.monotonic()
+                self.tokens = min(self.capacidade, self.tokens + (agora - self.ultimo) * self.taxa)
+                self.ultimo = agora
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                espera = (1 - self.tokens) / self.taxa
+            time.sleep(espera)
+
+
+limitador_yahoo = LimitadorTaxa(REQUISICOES_POR_SEGUNDO)
+
 
-def carregar_ativos():
+def calcular_backoff(tentativa):
+    espera = min(BACKOFF_MAXIMO_SEGUNDOS, BACKOFF_BASE_SEGUNDOS * (2 ** tentativa))
+    return random.uniform(espera / 2, espera)
+
+
+def buscar_informacoes_em_lote(lista, tipo, max_workers=None, progresso=None):
+    # Devolve (dados encontrados, tickers que o Yahoo não conhece). Falhas de rede/rate limit não
+    # entram em nenhuma das listas: não dizem nada sobre o ativo
+    max_workers = max_workers or MAX_WORKERS_COLETA
+
+    def buscar(ticker):
+        try:
+            info = obter_informacoes(ticker, tipo)
+        except FalhaConsultaYahoo as e:
+            if progresso is not None:
+                progresso.avancar(erro=f"{ticker}: {e}")
+            return ticker, None, False
+        if progresso is not None:
+            progresso.avancar(erro=None if info else f"{ticker}: sem dados")
+        return ticker, info, info is None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        resultados = list(executor.map(buscar, lista))
+    dados = [info for _, info, _ in resultados if info is not None]
+    ausentes = [ticker for ticker, _, ausente in resultados if ausente]
+    return dados, ausentes
+
+
+def carregar_ativos(progresso=None):
     acoes = LISTA_ACOES
     fiis = LISTA_FIIS
     bdrs = LISTA_BDRS
     
+    global_state["carregando"] = True
     try:
         print("🔄 Iniciando carregamento de ativos...")
         
+        if progresso is not None:
+            progresso.definir_total(sum(len(set(lista)) for lista in (acoes, bdrs, fiis)))
 
-
-        acoes_filtradas = processar_ativos(acoes, 'Ação')
-        bdrs_filtradas = processar_ativos(bdrs, 'BDR')
-        fiis_filtradas = processar_ativos(fiis, 'FII')
+        acoes_filtradas = processar_ativos(acoes, 'Ação', progresso)
+        bdrs_filtradas = processar_ativos(bdrs, 'BDR', progresso)
+        fiis_filtradas = processar_ativos(fiis, 'FII', progresso)
 
 
 
@@ -1273,16 +1345,26 @@ def carregar_ativos():
             print(f" Carregamento concluído! {len(df_ativos)} ativos carregados.")
             print(f" Colunas disponíveis: {df_ativos.columns.tolist()}")
 
-        global_state["df_ativos"] = df_ativos
+        global_state["df_universo"] = montar_universo()
+        publicar_ativos(df_ativos)
 
     except Exception as e:
         print(f" Erro no carregamento dos ativos: {e}")
+        if progresso is not None:
+            progresso.registrar_erro(str(e))
+    finally:
+        global_state["carregando"] = False
+
 
 
 
 
 
 
+class FalhaConsultaYahoo(Exception):
+    # Erro de rede, timeout ou rate limit esgotado: diferente de "ativo não encontrado" (None)
+    pass
+
 
 def obter_informacoes(ticker, tipo_ativo, max_retentativas=3):
     def to_float_or_inf(valor):
@@ -1297,8 +1379,7 @@ def obter_informacoes(ticker, tipo_ativo, max_retentativas=3):
         try:
             print(f"🔍 Buscando informações para {ticker}...")
 
-            acao = yf.Ticker(ticker)
-            info = acao.info
+            info = obter_info(ticker, limitador_yahoo)
 
 
             if not info or "sector" not in info:
@@ -1344,15 +1425,16 @@ def obter_informacoes(ticker, tipo_ativo, max_retentativas=3):
         except Exception as e:
             msg_erro = str(e).lower()
             if "too many requests" in msg_erro or "rate limited" in msg_erro:
-                print(f"⚠️ Rate limit detectado para {ticker}. Aguardando 60s e tentando novamente...")
-                time.sleep(60)
+                espera = calcular_backoff(tentativas)
+                print(f"⚠️ Rate limit detectado para {ticker}. Aguardando {espera:.1f}s e tentando novamente...")
+                time.sleep(espera)
                 tentativas += 1
             else:
                 print(f" Erro ao obter informações para {ticker}: {e}")
-                return None
+                raise FalhaConsultaYahoo(str(e)) from e
 
     print(f"⚠️ Não foi possível obter {ticker} após {max_retentativas} tentativas. Ignorando...")
-    return None
+    raise FalhaConsultaYahoo(f"rate limit após {max_retentativas} tentativas")
 
 
 
@@ -1360,44 +1442,63 @@ def obter_informacoes(ticker, tipo_ativo, max_retentativas=3):
 
 
 
-def aplicar_filtros_acoes(dados):
+FILTROS_PADRAO_ACOES = [
+    ("roe", ">=", 10),
+    ("dividend_yield", ">", 15),
+    ("pl", ">=", 1),
+    ("pl", "<=", 10),
+    ("pvp", "<=", 2),
+]
 
-    return sorted([
-        ativo for ativo in dados if (
-            ativo['roe'] >= 10 and
-            ativo['dividend_yield'] > 15 and
-            1 <= ativo['pl'] <= 10 and
-            ativo['pvp'] <= 2
-        )
-    ], key=lambda x: x['dividend_yield'], reverse=True)[:10]
+FILTROS_PADRAO_BDRS = [
+    ("roe", ">=", 10),
+    ("dividend_yield", ">", 3),
+    ("pl", ">=", 1),
+    ("pl", "<=", 10),
+    ("pvp", "<=", 3),
+]
 
+FILTROS_PADRAO_FIIS = [
+    ("dividend_yield", ">=", 10),
+    ("dividend_yield", "<=", 12),
+    ("liquidez_diaria", ">", 1000_000),
+]
 
-def aplicar_filtros_bdrs(dados):
 
-    return sorted([
-        ativo for ativo in dados if (
-            ativo['roe'] >= 10 and
-            ativo['dividend_yield'] > 3 and
-            1 <= ativo['pl'] <= 10 and
-            ativo['pvp'] <= 3
-        )
-    ], key=lambda x: x['dividend_yield'], reverse=True)[:10]
+def aplicar_filtros_acoes(dados):
+    return filtrar_ativos(dados, FILTROS_PADRAO_ACOES)
+
+
+def aplicar_filtros_bdrs(dados):
+    return filtrar_ativos(dados, FILTROS_PADRAO_BDRS)
 
 
 def aplicar_filtros_fiis(dados):
-    return sorted([
-        ativo for ativo in dados if (
-            10 <= ativo['dividend_yield'] <= 12 and
-            ativo.get("liquidez_diaria", 0) > 1000_000
-        )
-    ], key=lambda x: x['dividend_yield'], reverse=True)[:10]
+    return filtrar_ativos(dados, FILTROS_PADRAO_FIIS)
+
+
+def predicados_acoes(roe_min, dy_min, pl_min, pl_max, pvp_max):
+    return [
+        ("roe", ">=", roe_min or 0),
+        ("dividend_yield", ">", dy_min or 0),
+        ("pl", ">=", pl_min or 0),
+        ("pl", "<=", pl_max or float('inf')),
+        ("pvp", "<=", pvp_max or float('inf')),
+    ]
 
 
+def predicados_fiis(dy_min, dy_max, liq_min):
+    return [
+        ("dividend_yield", ">=", dy_min or 0),
+        ("dividend_yield", "<=", dy_max or float('inf')),
+        ("liquidez_diaria", ">", liq_min or 0),
+    ]
 
-def processar_ativos(lista, tipo):
 
-    dados = [obter_informacoes(ticker, tipo) for ticker in lista]
-    dados = [d for d in dados if d is not None] 
+
+def processar_ativos(lista, tipo, progresso=None):
+
+    dados = atualizar_fundamentos(lista, tipo, progresso)
 
     print(f"🔍 {tipo}: {len(dados)} ativos recuperados antes dos filtros.")
 
@@ -1450,6 +1551,7 @@ def formatar_numero(numero, tipo='preco'):
 
 
 def obter_todas_informacoes(ticker):
+    import yfinance as yf
     try:
         acao = yf.Ticker(ticker)
         print(f"Obtendo informações brutas para {ticker}...")
@@ -1479,12 +1581,275 @@ def obter_todas_informacoes(ticker):
 
 
 
+FUNDAMENTOS_DB_PATH = 'fundamentos.db'
+
+CAMPOS_FUNDAMENTOS = [
+    "nome_completo", "setor", "industria", "website", "roe", "preco_atual",
+    "dividend_yield", "pl", "pvp", "pais", "liquidez_diaria", "volume_medio",
+]
+
+# Tempo de validade (em segundos) de cada campo extraído por obter_informacoes
+TTL_CAMPOS_FUNDAMENTOS = {
+    "preco_atual": 15 * 60,
+    "liquidez_diaria": 60 * 60,
+    "volume_medio": 60 * 60,
+    "pl": 60 * 60,
+    "pvp": 60 * 60,
+    "dividend_yield": 6 * 60 * 60,
+    "roe": 24 * 60 * 60,
+    "nome_completo": 7 * 24 * 60 * 60,
+    "setor": 7 * 24 * 60 * 60,
+    "industria": 7 * 24 * 60 * 60,
+    "website": 7 * 24 * 60 * 60,
+    "pais": 7 * 24 * 60 * 60,
+}
+TTL_TICKER_AUSENTE = 6 * 60 * 60
+
+# Mesma ordem de chaves do dicionário retornado por obter_informacoes
+COLUNAS_ATIVO = [
+    "ticker", "nome_completo", "setor", "industria", "website", "roe", "preco_atual",
+    "dividend_yield", "pl", "pvp", "pais", "tipo", "liquidez_diaria", "volume_medio",
+]
+
+
+def criar_tabela_fundamentos():
+    with transacao(FUNDAMENTOS_DB_PATH) as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS fundamentos (
+                ticker TEXT PRIMARY KEY,
+                tipo TEXT NOT NULL,
+                encontrado INTEGER NOT NULL DEFAULT 1,
+                nome_completo TEXT,
+                setor TEXT,
+                industria TEXT,
+                website TEXT,
+                roe REAL,
+                preco_atual REAL,
+                dividend_yield REAL,
+                pl REAL,
+                pvp REAL,
+                pais TEXT,
+                liquidez_diaria REAL,
+                volume_medio REAL,
+                atualizado_em REAL NOT NULL,
+                hash_conteudo TEXT,
+                consultado_em REAL
+            )
+        ''')
+        colunas_existentes = {linha[1] for linha in conn.execute("PRAGMA table_info(fundamentos)")}
+        for coluna, tipo in (("hash_conteudo", "TEXT"), ("consultado_em", "REAL")):
+            if coluna not in colunas_existentes:
+                conn.execute(f"ALTER TABLE fundamentos ADD COLUMN {coluna} {tipo}")
+
+
+criar_tabela_fundamentos()
+
+
+def hash_fundamentos(dados):
+    conteudo = json.dumps([dados.get(campo) for campo in CAMPOS_FUNDAMENTOS], default=str)
+    return hashlib.sha1(conteudo.encode('utf-8')).hexdigest()
+
+
+def salvar_fundamentos(dados, tipo, ausentes=()):
+    agora = time.time()
+    colunas = ["ticker", "tipo", "encontrado"] + CAMPOS_FUNDAMENTOS + ["atualizado_em", "hash_conteudo"]
+    linhas = [
+        (d["ticker"], tipo, 1, *[d.get(campo) for campo in CAMPOS_FUNDAMENTOS], agora, hash_fundamentos(d))
+        for d in dados
+    ]
+    linhas += [
+        (ticker, tipo, 0, *[None] * len(CAMPOS_FUNDAMENTOS), agora, None)
+        for ticker in ausentes
+    ]
+    if not linhas:
+        return
+    atualizacoes = ', '.join(f"{coluna} = excluded.{coluna}" for coluna in colunas[1:])
+    executar_varios(
+        FUNDAMENTOS_DB_PATH,
+        f"INSERT INTO fundamentos ({', '.join(colunas)}) VALUES ({', '.join('?' * len(colunas))}) "
+        f"ON CONFLICT(ticker) DO UPDATE SET {atualizacoes}",
+        linhas
+    )
+    invalidar_grupo("fundamentos")
+
+
+def ttl_fundamentos(campos=None):
+    campos = campos or CAMPOS_FUNDAMENTOS
+    return min(TTL_CAMPOS_FUNDAMENTOS[campo] for campo in campos)
+
+
+def tickers_desatualizados(lista, campos=None):
+    ttl = ttl_fundamentos(campos)
+    agora = time.time()
+    registros = {
+        ticker: (encontrado, atualizado_em)
+        for ticker, encontrado, atualizado_em in consultar(FUNDAMENTOS_DB_PATH, "SELECT ticker, encontrado, atualizado_em FROM fundamentos")
+    }
+    desatualizados = []
+    for ticker in dict.fromkeys(lista):
+        registro = registros.get(ticker)
+        if registro is None:
+            desatualizados.append(ticker)
+            continue
+        encontrado, atualizado_em = registro
+        limite = ttl if encontrado else TTL_TICKER_AUSENTE
+        if agora - atualizado_em > limite:
+            desatualizados.append(ticker)
+    return desatualizados
+
+
+def carregar_fundamentos(lista):
+    linhas = consultar(FUNDAMENTOS_DB_PATH, f"SELECT {', '.join(COLUNAS_ATIVO)} FROM fundamentos WHERE encontrado = 1")
+    por_ticker = {linha[0]: dict(zip(COLUNAS_ATIVO, linha)) for linha in linhas}
+    return [dict(por_ticker[ticker]) for ticker in lista if ticker in por_ticker]
+
+
+def atualizar_fundamentos(lista, tipo, progresso=None):
+    lista = list(dict.fromkeys(lista))
+    # Só quem o Yahoo de fato não conhece vira "ausente"; com falha de consulta a linha atual fica como está
+    dados, ausentes = buscar_informacoes_em_lote(lista, tipo, progresso=progresso)
+    salvar_fundamentos(dados, tipo, ausentes=ausentes)
+    return dados
+
+
+def obter_fundamentos(lista, tipo, campos=None):
+    desatualizados = tickers_desatualizados(lista, campos)
+    if desatualizados:
+        print(f"🔄 {tipo}: atualizando {len(desatualizados)} de {len(set(lista))} ativos no snapshot...")
+        atualizar_fundamentos(desatualizados, tipo)
+    return carregar_fundamentos(lista)
+
+
+CARTEIRA_DB_PATH = 'carteira.db'
+TAMANHO_LOTE_INCREMENTAL = int(os.environ.get("FINMA_LOTE_INCREMENTAL", 100))
+JANELA_CONSULTA_RECENTE = 24 * 60 * 60
+
+TIPO_POR_TICKER = {
+    **{ticker: 'Ação' for ticker in LISTA_ACOES},
+    **{ticker: 'BDR' for ticker in LISTA_BDRS},
+    **{ticker: 'FII' for ticker in LISTA_FIIS},
+}
+
+
+def registrar_consulta(tickers):
+    if not tickers:
+        return
+    executar_varios(
+        FUNDAMENTOS_DB_PATH,
+        "UPDATE fundamentos SET consultado_em = ? WHERE ticker = ?",
+        [(time.time(), ticker) for ticker in tickers]
+    )
+
+
+def tickers_carteira():
+    if not os.path.exists(CARTEIRA_DB_PATH):
+        return []
+    try:
+        return [linha[0] for linha in consultar(CARTEIRA_DB_PATH, "SELECT DISTINCT ticker FROM carteira")]
+    except sqlite3.Error:
+        return []
+
+
+def selecionar_lote_incremental(tamanho_lote=None):
+    tamanho_lote = tamanho_lote or TAMANHO_LOTE_INCREMENTAL
+    universo = {ticker.upper(): ticker for ticker in TIPO_POR_TICKER}
+
+    recentes = [
+        linha[0] for linha in consultar(
+            FUNDAMENTOS_DB_PATH,
+            "SELECT ticker FROM fundamentos WHERE consultado_em >= ? ORDER BY consultado_em DESC",
+            (time.time() - JANELA_CONSULTA_RECENTE,)
+        )
+    ]
+    registrados = [linha[0] for linha in consultar(FUNDAMENTOS_DB_PATH, "SELECT ticker FROM fundamentos ORDER BY atualizado_em ASC")]
+
+    # Prioridade: posições da carteira, ativos consultados recentemente, nunca buscados e, por fim, os mais antigos
+    ja_buscados = set(registrados)
+    nunca_buscados = [ticker for ticker in TIPO_POR_TICKER if ticker not in ja_buscados]
+    candidatos = (
+        [universo.get(ticker.upper()) for ticker in tickers_carteira()]
+        + recentes + nunca_buscados + registrados
+    )
+    lote = [ticker for ticker in dict.fromkeys(candidatos) if ticker in TIPO_POR_TICKER]
+    return lote[:tamanho_lote]
+
+
+def carregar_hashes(lista):
+    hashes = dict(consultar(FUNDAMENTOS_DB_PATH, "SELECT ticker, hash_conteudo FROM fundamentos"))
+    return {ticker: hashes.get(ticker) for ticker in lista}
+
+
+def montar_universo():
+    todos = list(TIPO_POR_TICKER)
+    return pd.DataFrame(carregar_fundamentos(todos), columns=COLUNAS_ATIVO).set_index("ticker", drop=False)
+
+
+def mesclar_no_universo(df_universo, dados):
+    df_novos = pd.DataFrame(dados).set_index("ticker", drop=False)
+    existentes = df_novos.index.intersection(df_universo.index)
+    colunas = [coluna for coluna in df_universo.columns if coluna in df_novos.columns]
+    df_universo.loc[existentes, colunas] = df_novos.loc[existentes, colunas]
+    novos = df_novos.index.difference(df_universo.index)
+    if len(novos):
+        df_universo = pd.concat([df_universo, df_novos.loc[novos, df_universo.columns]])
+    return df_universo
+
+
+def filtrar_universo(df_universo):
+    filtrados = []
+    for tipo, filtros in (("Ação", FILTROS_PADRAO_ACOES), ("BDR", FILTROS_PADRAO_BDRS), ("FII", FILTROS_PADRAO_FIIS)):
+        df_tipo = df_universo[df_universo["tipo"] == tipo].reset_index(drop=True)
+        filtrados += filtrar_ativos(df_tipo, filtros)
+    return pd.DataFrame(filtrados, columns=COLUNAS_ATIVO)
+
+
+def carregar_ativos_incremental(progresso=None, tamanho_lote=None):
+    lote = selecionar_lote_incremental(tamanho_lote)
+    if progresso is not None:
+        progresso.definir_total(len(lote))
+
+    global_state["carregando"] = True
+    try:
+        print(f"🔄 Atualização incremental de {len(lote)} ativos...")
+        hashes_anteriores = carregar_hashes(lote)
+        dados = []
+        for tipo in ('Ação', 'BDR', 'FII'):
+            sublote = [ticker for ticker in lote if TIPO_POR_TICKER[ticker] == tipo]
+            if sublote:
+                dados += atualizar_fundamentos(sublote, tipo, progresso)
+        alterados = [d for d in dados if hash_fundamentos(d) != hashes_anteriores.get(d["ticker"])]
+        print(f" {len(alterados)} de {len(lote)} ativos mudaram desde a última busca.")
+
+        df_universo = global_state.get("df_universo")
+        if df_universo is None:
+            df_universo = montar_universo()
+        elif alterados:
+            df_universo = mesclar_no_universo(df_universo, alterados)
+        else:
+            return
+        global_state["df_universo"] = df_universo
+        publicar_ativos(filtrar_universo(df_universo))
+    finally:
+        global_state["carregando"] = False
+
+
+def carregar_universo(progresso=None, modo="completo"):
+    # Carga completa e incremental escrevem o mesmo global_state e a mesma tabela fundamentos:
+    # uma única Tarefa para os dois modos garante que nunca rodem ao mesmo tempo
+    global_state["modo_carregamento"] = modo
+    if modo == "incremental":
+        carregar_ativos_incremental(progresso)
+    else:
+        carregar_ativos(progresso)
+
+
+tarefa_carregamento = Tarefa("carregar_ativos", carregar_universo)
+
+
 USUARIOS_DB_PATH = 'usuarios.db'
 
 def criar_tabela_usuarios():
-    conn = sqlite3.connect(USUARIOS_DB_PATH)
-    c = conn.cursor()
-    c.execute('''
+    executar(USUARIOS_DB_PATH, '''
         CREATE TABLE IF NOT EXISTS usuarios (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             nome TEXT NOT NULL,
@@ -1493,30 +1858,19 @@ def criar_tabela_usuarios():
             data_cadastro TEXT NOT NULL
         )
     ''')
-    conn.commit()
-    conn.close()
 
 def cadastrar_usuario(nome, username, senha):
     senha_hash = bcrypt.hashpw(senha.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
     data_cadastro = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    conn = sqlite3.connect(USUARIOS_DB_PATH)
-    c = conn.cursor()
     try:
-        c.execute('''INSERT INTO usuarios (nome, username, senha_hash, data_cadastro) VALUES (?, ?, ?, ?)''',
-                  (nome, username, senha_hash, data_cadastro))
-        conn.commit()
+        executar(USUARIOS_DB_PATH, '''INSERT INTO usuarios (nome, username, senha_hash, data_cadastro) VALUES (?, ?, ?, ?)''',
+                 (nome, username, senha_hash, data_cadastro))
         return True
     except sqlite3.IntegrityError:
         return False
-    finally:
-        conn.close()
 
 def buscar_usuario_por_username(username):
-    conn = sqlite3.connect(USUARIOS_DB_PATH)
-    c = conn.cursor()
-    c.execute('SELECT id, nome, username, senha_hash, data_cadastro FROM usuarios WHERE username = ?', (username,))
-    row = c.fetchone()
-    conn.close()
+    row = consultar_um(USUARIOS_DB_PATH, 'SELECT id, nome, username, senha_hash, data_cadastro FROM usuarios WHERE username = ?', (username,))
     if row:
         return {
             'id': row[0],
@@ -1533,47 +1887,33 @@ def verificar_senha(username, senha):
         return bcrypt.checkpw(senha.encode('utf-8'), usuario['senha_hash'].encode('utf-8'))
     return False
 
-def processar_ativos_acoes_com_filtros(roe_min, dy_min, pl_min, pl_max, pvp_max):
-    acoes = LISTA_ACOES
-    dados = [obter_informacoes(ticker, 'Ação') for ticker in acoes]
-    dados = [d for d in dados if d is not None]
-    filtrados = [
-        ativo for ativo in dados if (
-            ativo['roe'] >= (roe_min or 0) and
-            ativo['dividend_yield'] > (dy_min or 0) and
-            (pl_min or 0) <= ativo['pl'] <= (pl_max or float('inf')) and
-            ativo['pvp'] <= (pvp_max or float('inf'))
-        )
-    ]
-    return sorted(filtrados, key=lambda x: x['dividend_yield'], reverse=True)[:10]
-
-def processar_ativos_bdrs_com_filtros(roe_min, dy_min, pl_min, pl_max, pvp_max):
-    bdrs = LISTA_BDRS
-    dados = [obter_informacoes(ticker, 'BDR') for ticker in bdrs]
-    dados = [d for d in dados if d is not None]
-    filtrados = [
-        ativo for ativo in dados if (
-            ativo['roe'] >= (roe_min or 0) and
-            ativo['dividend_yield'] > (dy_min or 0) and
-            (pl_min or 0) <= ativo['pl'] <= (pl_max or float('inf')) and
-            ativo['pvp'] <= (pvp_max or float('inf'))
-        )
-    ]
-    return sorted(filtrados, key=lambda x: x['dividend_yield'], reverse=True)[:10]
-
-def processar_ativos_fiis_com_filtros(dy_min, dy_max, liq_min):
-    fiis = LISTA_FIIS
-    dados = [obter_informacoes(ticker, 'FII') for ticker in fiis]
-    dados = [d for d in dados if d is not None]
-    filtrados = [
-        ativo for ativo in dados if (
-            (dy_min or 0) <= ativo['dividend_yield'] <= (dy_max or float('inf')) and
-            ativo.get('liquidez_diaria', 0) > (liq_min or 0)
-        )
-    ]
-    return sorted(filtrados, key=lambda x: x['dividend_yield'], reverse=True)[:10]
+# Resultados do screener por combinação de filtros, descartados quando os fundamentos são regravados
+@memoizar(grupos=["fundamentos"])
+def filtrar_acoes(roe_min, dy_min, pl_min, pl_max, pvp_max):
+    dados = obter_fundamentos(LISTA_ACOES, 'Ação', ["roe", "dividend_yield", "pl", "pvp"])
+    return filtrar_ativos(dados, predicados_acoes(roe_min, dy_min, pl_min, pl_max, pvp_max))
 
+@memoizar(grupos=["fundamentos"])
+def filtrar_bdrs(roe_min, dy_min, pl_min, pl_max, pvp_max):
+    dados = obter_fundamentos(LISTA_BDRS, 'BDR', ["roe", "dividend_yield", "pl", "pvp"])
+    return filtrar_ativos(dados, predicados_acoes(roe_min, dy_min, pl_min, pl_max, pvp_max))
 
+@memoizar(grupos=["fundamentos"])
+def filtrar_fiis(dy_min, dy_max, liq_min):
+    dados = obter_fundamentos(LISTA_FIIS, 'FII', ["dividend_yield", "liquidez_diaria"])
+    return filtrar_ativos(dados, predicados_fiis(dy_min, dy_max, liq_min))
 
+def processar_ativos_acoes_com_filtros(roe_min, dy_min, pl_min, pl_max, pvp_max):
+    filtrados = filtrar_acoes(roe_min, dy_min, pl_min, pl_max, pvp_max)
+    registrar_consulta([ativo['ticker'] for ativo in filtrados])
+    return filtrados
 
+def processar_ativos_bdrs_com_filtros(roe_min, dy_min, pl_min, pl_max, pvp_max):
+    filtrados = filtrar_bdrs(roe_min, dy_min, pl_min, pl_max, pvp_max)
+    registrar_consulta([ativo['ticker'] for ativo in filtrados])
+    return filtrados
 
+def processar_ativos_fiis_com_filtros(dy_min, dy_max, liq_min):
+    filtrados = filtrar_fiis(dy_min, dy_max, liq_min)
+    registrar_consulta([ativo['ticker'] for ativo in filtrados])
+    return filtrados
@@ -2,55 +2,26 @@
 
 import os
 import pandas as pd
-from datetime import date, datetime
+from datetime import datetime
 from dash import html, Input, Output, dcc, callback
 import dash_bootstrap_components as dbc
-from llama_cpp import Llama
 import models
-from pages.carteira import consultar_carteira, consultar_historico
-from pages.controle import calcular_saldo_mes_ano, carregar_receitas_mes_ano, carregar_outros_mes_ano, carregar_cartoes_mes_ano
-from pages.ia import gerar_insights
+from pages.ia import gerar_insights, retrato_financeiro
 from dash import callback_context
-import plotly.express as px
 from dash.dependencies import State
-import yfinance as yf
+from dash.exceptions import PreventUpdate
+from cache_cotacoes import obter_historico
+from servico_ia import enviar_pergunta, consultar_resposta, cancelar_resposta
 
-CAMINHO_MODELO = "modelos/mistral-7b-instruct-v0.1.Q4_K_M.gguf"
-
-modelo_global = None
-
-def carregar_modelo():
-    global modelo_global
-    if modelo_global is None:
-        modelo_global = Llama(model_path=CAMINHO_MODELO, n_ctx=2048, verbose=False)
-    return modelo_global
+INTERVALO_STREAMING_MS = 400
 
 def analisar_contexto_financeiro():
-    hoje = date.today()
-    mes = str(hoje.month).zfill(2)
-    ano = str(hoje.year)
-    
-
-    df_carteira = pd.DataFrame(consultar_carteira())
-    df_hist = consultar_historico('mensal')
-    saldo = calcular_saldo_mes_ano(mes, ano)
-    receitas = carregar_receitas_mes_ano(mes, ano)
-    total_receitas = receitas['valor'].sum() if not receitas.empty else 0
-    outros_gastos = carregar_outros_mes_ano(mes, ano)
-    total_outros = sum([g['valor'] for g in outros_gastos]) if outros_gastos else 0
-    cartoes = carregar_cartoes_mes_ano(mes, ano)
-    total_cartoes = sum([c['valor'] for c in cartoes if c.get('pago') == 'Sim']) if cartoes else 0
-    total_gastos = total_outros + total_cartoes
-    total_investido = df_carteira['valor_total'].sum() if not df_carteira.empty else 0
-    
-
-    rentab = 0
-    if not df_hist.empty:
-        df_hist = df_hist.sort_values('data')
-        inicial = df_hist.iloc[0]['valor_total']
-        final = df_hist.iloc[-1]['valor_total']
-        if inicial:
-            rentab = ((final - inicial) / inicial) * 100
+    retrato = retrato_financeiro()
+    saldo = retrato["saldo"]
+    total_receitas = retrato["total_receitas"]
+    total_gastos = retrato["total_gastos"]
+    total_investido = retrato["total_investido"]
+    rentab = retrato["rentabilidade"]
     
 
     alertas = []
@@ -68,13 +39,12 @@ def analisar_contexto_financeiro():
     if rentab < 0:
         alertas.append(f"🟥 Rentabilidade negativa no mês: {rentab:.2f}%.")
         sugestoes.append("Analise os ativos com pior desempenho e avalie ajustes na carteira.")
-    if df_carteira.empty:
+    if retrato["carteira_vazia"]:
         alertas.append("⚠️ Você ainda não possui ativos na carteira.")
         sugestoes.append("Considere investir para potencializar seu patrimônio.")
     else:
 
-        tipo_distrib = df_carteira['tipo'].value_counts(normalize=True)
-        for tipo, prop in tipo_distrib.items():
+        for tipo, prop in retrato["distribuicao"]:
             if prop > 0.6:
                 alertas.append(f"🟥 Mais de {int(prop*100)}% da carteira está concentrada em {tipo}s.")
                 sugestoes.append(f"Avalie diversificar mais seus investimentos além de {tipo}s.")
@@ -82,36 +52,27 @@ def analisar_contexto_financeiro():
                 alertas.append(f"🟨 {int(prop*100)}% da carteira está em {tipo}s.")
                 sugestoes.append(f"Atenção ao equilíbrio entre tipos de ativos.")
 
-        top_ativo = df_carteira.nlargest(1, 'valor_total')
-        if not top_ativo.empty:
-            ativo = top_ativo.iloc[0]
+        ativo = retrato["maior_ativo"]
+        if ativo:
             if ativo['valor_total'] > total_investido * 0.5:
                 alertas.append(f"🟧 O ativo {ativo['ticker']} representa mais de 50% da carteira.")
                 sugestoes.append(f"Considere distribuir melhor entre outros ativos.")
 
-        for indicador in ['dy', 'pl', 'pvp', 'roe']:
-            media = df_carteira[indicador].mean()
-            if not pd.isna(media):
-                if indicador == 'dy' and media < 2:
-                    alertas.append(f"🟨 Dividend Yield médio baixo: {media:.2f}%.")
-                    sugestoes.append("Busque ativos com melhor distribuição de dividendos.")
-                if indicador == 'pl' and media > 20:
-                    alertas.append(f"🟧 P/L médio elevado: {media:.2f}.")
-                    sugestoes.append("Avalie se há ativos caros na carteira.")
-                if indicador == 'roe' and media < 10:
-                    alertas.append(f"🟨 ROE médio baixo: {media:.2f}%.")
-                    sugestoes.append("Busque empresas mais rentáveis.")
-
-    df_mov = None
-    try:
-        from pages.carteira import consultar_movimentacoes
-        df_mov = consultar_movimentacoes(mes, ano)
-    except Exception:
-        pass
-    if df_mov is not None and not df_mov.empty:
-        ultimas = df_mov.sort_values('data', ascending=False).head(3)
+        for indicador, media in retrato["medias"].items():
+            if indicador == 'dy' and media < 2:
+                alertas.append(f"🟨 Dividend Yield médio baixo: {media:.2f}%.")
+                sugestoes.append("Busque ativos com melhor distribuição de dividendos.")
+            if indicador == 'pl' and media > 20:
+                alertas.append(f"🟧 P/L médio elevado: {media:.2f}.")
+                sugestoes.append("Avalie se há ativos caros na carteira.")
+            if indicador == 'roe' and media < 10:
+                alertas.append(f"🟨 ROE médio baixo: {media:.2f}%.")
+                sugestoes.append("Busque empresas mais rentáveis.")
+
+    ultimas = retrato["ultimas_movimentacoes"]
+    if ultimas:
         ultimas_str = '\n'.join([
-            f"{row['data'][:10]}: {row['tipo'].capitalize()} {row['quantidade']} de {row['ticker']} a R$ {row['preco']:.2f}" for _, row in ultimas.iterrows()
+            f"{row['data'][:10]}: {row['tipo'].capitalize()} {row['quantidade']} de {row['ticker']} a R$ {row['preco']:.2f}" for row in ultimas
         ])
     else:
         ultimas_str = "Nenhuma movimentação recente."
@@ -121,52 +82,33 @@ def analisar_contexto_financeiro():
     """
     return resumo, alertas, sugestoes
 
-def construir_prompt(pergunta):
+def construir_prefixo():
+    # Parte fixa do prompt (instruções + contexto financeiro): o serviço de IA guarda o estado do modelo
+    # depois de avaliá-la e só a recalcula quando o contexto muda
     resumo, alertas, sugestoes = analisar_contexto_financeiro()
     alertas_str = '\n'.join(alertas) if alertas else 'Nenhum alerta crítico.'
     sugestoes_str = '\n'.join(sugestoes) if sugestoes else 'Nenhuma sugestão específica.'
-    prompt = f"""
-Você é um agente financeiro inteligente e proativo. Analise o contexto abaixo, gere alertas, sugestões e responda dúvidas sobre o sistema ou finanças.\n\nContexto do usuário:\n{resumo}\n\nAlertas detectados:\n{alertas_str}\n\nSugestões do agente:\n{sugestoes_str}\n\nPergunta do usuário: {pergunta}\n\nResponda de forma clara, útil e, se possível, proativa, mesmo que o usuário não pergunte nada diretamente.
+    return f"""
+Você é um agente financeiro inteligente e proativo. Analise o contexto abaixo, gere alertas, sugestões e responda dúvidas sobre o sistema ou finanças.\n\nContexto do usuário:\n{resumo}\n\nAlertas detectados:\n{alertas_str}\n\nSugestões do agente:\n{sugestoes_str}\n\n"""
+
+def construir_prompt(pergunta):
+    prefixo = construir_prefixo()
+    prompt = prefixo + f"""Pergunta do usuário: {pergunta}\n\nResponda de forma clara, útil e, se possível, proativa, mesmo que o usuário não pergunte nada diretamente.
     """
-    return prompt
+    return prefixo, prompt
 
 def get_dashboard_data():
-    hoje = date.today()
-    mes = str(hoje.month).zfill(2)
-    ano = str(hoje.year)
-
-    df_carteira = pd.DataFrame(consultar_carteira())
-    total_investido = df_carteira['valor_total'].sum() if not df_carteira.empty else 0
-
-    df_hist = consultar_historico('mensal')
-    rentab = 0
-    if not df_hist.empty:
-        df_hist = df_hist.sort_values('data')
-        inicial = df_hist.iloc[0]['valor_total']
-        final = df_hist.iloc[-1]['valor_total']
-        if inicial:
-            rentab = ((final - inicial) / inicial) * 100
-
-    saldo = calcular_saldo_mes_ano(mes, ano)
-    receitas = carregar_receitas_mes_ano(mes, ano)
-    total_receitas = receitas['valor'].sum() if not receitas.empty else 0
-    outros_gastos = carregar_outros_mes_ano(mes, ano)
-    total_outros = sum([g['valor'] for g in outros_gastos]) if outros_gastos else 0
-    cartoes = carregar_cartoes_mes_ano(mes, ano)
-    total_cartoes = sum([c['valor'] for c in cartoes if c.get('pago') == 'Sim']) if cartoes else 0
-    total_gastos = total_outros + total_cartoes
-    # Insights
+    # Só formatação sobre o retrato em cache: o painel e o botão de ocultar valores não consultam os bancos
+    retrato = retrato_financeiro()
     insights = gerar_insights()
     insight_principal = insights[0] if insights else "Sem insights no momento."
     return {
-        'total_investido': total_investido,
-        'saldo': saldo,
-        'total_receitas': total_receitas,
-        'total_gastos': total_gastos,
-        'rentabilidade': rentab,
+        'total_investido': retrato['total_investido'],
+        'saldo': retrato['saldo'],
+        'total_receitas': retrato['total_receitas'],
+        'total_gastos': retrato['total_gastos'],
+        'rentabilidade': retrato['rentabilidade'],
         'insight': insight_principal,
-        'debug_cartoes': cartoes,
-        'debug_outros': outros_gastos
     }
 
 def layout():
@@ -295,7 +237,10 @@ def layout():
                     dbc.CardBody([
                         html.P("Pergunte sobre sua carteira ou finanças em geral:", className="mb-2 text-muted small"),
                         dbc.Input(id="input-pergunta-ia", type="text", placeholder="Ex: O que é o Ibovespa?", debounce=True, className="mb-2"),
-                        html.Div(id="output-resposta-ia", className="mt-2 p-3 border rounded assistente-output animate__animated animate__fadeIn")
+                        html.Div(id="output-resposta-ia", className="mt-2 p-3 border rounded assistente-output animate__animated animate__fadeIn"),
+                        # Resposta em andamento: id do trabalho no serviço de IA e consulta periódica do texto parcial
+                        dcc.Store(id="ia-trabalho"),
+                        dcc.Interval(id="ia-intervalo", interval=INTERVALO_STREAMING_MS, disabled=True),
                     ])
                 ], className="shadow-sm animate__animated animate__fadeInRight")
             ], md=8, xs=12, style={"minWidth": "320px", "margin": "0 auto"}),
@@ -325,23 +270,54 @@ def layout():
 
 def registrar_callbacks(app):
     @app.callback(
-        Output("output-resposta-ia", "children"),
-        Input("input-pergunta-ia", "value")
+        [Output("ia-trabalho", "data"), Output("ia-intervalo", "disabled")],
+        Input("input-pergunta-ia", "value"),
+        State("ia-trabalho", "data"),
+        prevent_initial_call=True
     )
-    def responder_ia(pergunta):
+    def responder_ia(pergunta, trabalho_anterior):
+        # Pergunta vazia (campo limpo) não vai para a fila do modelo
+        if not pergunta or not pergunta.strip():
+            raise PreventUpdate
+        # Nova pergunta cancela a geração anterior; o texto chega aos poucos por acompanhar_resposta_ia
+        if trabalho_anterior and trabalho_anterior.get("id"):
+            cancelar_resposta(trabalho_anterior["id"])
         try:
-            prompt = construir_prompt(pergunta or "")
-            resposta = carregar_modelo()(prompt, max_tokens=256)  
-            texto = resposta["choices"][0]["text"].strip()
-            return html.Div([
-                html.H6("Resposta:"),
-                html.P(texto)
-            ])
+            prefixo, prompt = construir_prompt(pergunta)
+            # O modelo roda no processo de servico_ia.py, compartilhado por todos os workers
+            return {"id": enviar_pergunta(prompt, max_tokens=256, prefixo=prefixo, pergunta=pergunta)}, False
+        except Exception as e:
+            return {"erro": str(e)}, True
+
+    @app.callback(
+        [Output("output-resposta-ia", "children"), Output("ia-intervalo", "disabled", allow_duplicate=True)],
+        [Input("ia-intervalo", "n_intervals"), Input("ia-trabalho", "data")],
+        prevent_initial_call=True
+    )
+    def acompanhar_resposta_ia(_, trabalho):
+        try:
+            if not trabalho:
+                return None, True
+            if trabalho.get("erro"):
+                raise RuntimeError(trabalho["erro"])
+            resultado = consultar_resposta(trabalho["id"])
+            if resultado.get("erro"):
+                raise RuntimeError(resultado["erro"])
         except Exception as e:
             return html.Div([
                 html.H6("❌ Erro ao processar a pergunta:"),
                 html.Pre(str(e))
-            ])
+            ]), True
+
+        estado = resultado["estado"]
+        if estado == "na_fila":
+            return html.P(f"⏳ Aguardando na fila (posição {resultado.get('posicao', 1)})...", className="text-muted"), False
+        if estado == "gerando" and not resultado["texto"]:
+            return html.P("✍️ Pensando...", className="text-muted"), False
+        return html.Div([
+            html.H6("Resposta:"),
+            html.P(resultado["texto"] + (" ▌" if estado == "gerando" else ""))
+        ]), estado not in ("na_fila", "gerando")
 
     @app.callback(
         Output("assistente-grafico-evolucao", "figure"),
@@ -351,7 +327,6 @@ def registrar_callbacks(app):
         from datetime import date
         from pages.carteira import consultar_historico
         import plotly.express as px
-        import yfinance as yf
         template = 'plotly_dark' if is_dark else 'simple_white'
         if is_dark:
             bg_color = "#18191A"
@@ -380,7 +355,7 @@ def registrar_callbacks(app):
             }
             for ticker, nome in tickers.items():
                 try:
-                    dados = yf.Ticker(ticker).history(start=data_inicio, end=data_fim)
+                    dados = obter_historico(ticker, start=data_inicio, end=data_fim)
                     if not dados.empty:
                         dados = dados["Close"]
                         dados_normalizado = dados / dados.iloc[0] * 100
@@ -1,72 +1,89 @@
-import sqlite3
 import pandas as pd
-import yfinance as yf
 from datetime import date, datetime
+from concurrent.futures import ThreadPoolExecutor
 from dash import dcc, html, Input, Output, State
 import dash_bootstrap_components as dbc
 from dash import dash_table  
-import plotly.express as px
 from dash_table.Format import Format, Symbol
 from complete_b3_logos_mapping import add_logo_column_to_data, get_table_columns_with_logo
+from banco import conexao, transacao, consultar, consultar_um, executar, executar_varios, intervalo_mes
+from diferencas import diferenca_tabelas, edicao_da_tabela
+from cache_cotacoes import obter_info, obter_historico, obter_dividendos
+from cache_compartilhado import memoizar, invalidar_grupo
+
+CARTEIRA_DB_PATH = 'carteira.db'
 
 def init_db():
-    conn = sqlite3.connect('carteira.db', check_same_thread=False)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS carteira (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ticker TEXT NOT NULL,
-            nome_completo TEXT NOT NULL,
-            quantidade INTEGER NOT NULL,
-            preco_atual REAL NOT NULL,
-            valor_total REAL NOT NULL,
-            data_adicao TEXT NOT NULL,
-            tipo TEXT DEFAULT 'Desconhecido',
-            dy REAL,
-            pl REAL,
-            pvp REAL,
-            roe REAL
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS historico_carteira (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            data TEXT NOT NULL,
-            valor_total REAL NOT NULL
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS movimentacoes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            data TEXT NOT NULL,
-            ticker TEXT NOT NULL,
-            nome_completo TEXT,
-            quantidade REAL NOT NULL,
-            preco REAL NOT NULL,
-            tipo TEXT NOT NULL -- 'compra' ou 'venda'
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    with transacao(CARTEIRA_DB_PATH) as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS carteira (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ticker TEXT NOT NULL,
+                nome_completo TEXT NOT NULL,
+                quantidade INTEGER NOT NULL,
+                preco_atual REAL NOT NULL,
+                valor_total REAL NOT NULL,
+                data_adicao TEXT NOT NULL,
+                tipo TEXT DEFAULT 'Desconhecido',
+                dy REAL,
+                pl REAL,
+                pvp REAL,
+                roe REAL
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS historico_carteira (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                data TEXT NOT NULL,
+                valor_total REAL NOT NULL
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS movimentacoes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                data TEXT NOT NULL,
+                ticker TEXT NOT NULL,
+                nome_completo TEXT,
+                quantidade REAL NOT NULL,
+                preco REAL NOT NULL,
+                tipo TEXT NOT NULL -- 'compra' ou 'venda'
+            )
+        ''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_historico_carteira_data ON historico_carteira(data)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_movimentacoes_data ON movimentacoes(data)")
+        # Versão da carteira: incrementada por trigger a cada escrita (invalida o retrato financeiro em cache)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS carteira_versao (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                versao INTEGER NOT NULL
+            )
+        ''')
+        conn.execute("INSERT OR IGNORE INTO carteira_versao (id, versao) VALUES (1, 0)")
+        for tabela in ("carteira", "historico_carteira", "movimentacoes"):
+            for operacao in ("INSERT", "UPDATE", "DELETE"):
+                conn.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_{tabela}_{operacao.lower()}_versao
+                    AFTER {operacao} ON {tabela}
+                    BEGIN
+                        UPDATE carteira_versao SET versao = versao + 1 WHERE id = 1;
+                    END
+                ''')
 
 
 init_db()
 
+# Sem consulta de câmbio na importação: a cotação é buscada no primeiro uso e fica em cache_cotacoes
 def obter_cotacao_dolar():
     try:
-        cotacao = yf.Ticker("BRL=X").info.get("regularMarketPrice")
+        cotacao = obter_info("BRL=X").get("regularMarketPrice")
         return cotacao if cotacao else 5.0
     except:
         return 5.0
 
 
-
-cotacao_global_brl = obter_cotacao_dolar()
-
 def obter_informacoes_ativo(ticker):
     try:
-        acao = yf.Ticker(ticker)
-        info = acao.info
+        info = obter_info(ticker)
         preco_atual = info.get("currentPrice") or info.get("regularMarketPrice") or info.get("previousClose")
 
         tipo_map = {
@@ -81,7 +98,7 @@ def obter_informacoes_ativo(ticker):
             return None
 
         if tipo == "Criptomoeda":
-            preco_atual *= cotacao_global_brl
+            preco_atual *= obter_cotacao_dolar()
 
         return {
             "ticker": ticker.upper(),
@@ -99,35 +116,30 @@ def obter_informacoes_ativo(ticker):
 
 
 def adicionar_ou_atualizar_ativo(ticker, nome_completo, quantidade, preco_atual, tipo, dy, pl, pvp, roe):
-    conn = sqlite3.connect('carteira.db', check_same_thread=False)
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT id, quantidade FROM carteira WHERE ticker = ?", (ticker,))
-    existente = cursor.fetchone()
-
-    if existente:
-        id_existente, qtd_existente = existente
-        nova_qtd = qtd_existente + quantidade
-        novo_valor_total = nova_qtd * preco_atual
-        cursor.execute("""
-            UPDATE carteira
-            SET quantidade = ?, preco_atual = ?, valor_total = ?, tipo = ?,
-                dy = ?, pl = ?, pvp = ?, roe = ?
-            WHERE id = ?
-        """, (nova_qtd, preco_atual, novo_valor_total, tipo,
-              dy, pl, pvp, roe, id_existente))
-    else:
-        valor_total = preco_atual * quantidade
-        cursor.execute("""
-            INSERT INTO carteira 
-                (ticker, nome_completo, quantidade, preco_atual, valor_total, 
-                 data_adicao, tipo, dy, pl, pvp, roe)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (ticker, nome_completo, quantidade, preco_atual, valor_total,
-              date.today(), tipo, dy, pl, pvp, roe))
-
-    conn.commit()
-    conn.close()
+    with transacao(CARTEIRA_DB_PATH) as conn:
+        existente = conn.execute("SELECT id, quantidade FROM carteira WHERE ticker = ?", (ticker,)).fetchone()
+
+        if existente:
+            id_existente, qtd_existente = existente
+            nova_qtd = qtd_existente + quantidade
+            novo_valor_total = nova_qtd * preco_atual
+            conn.execute("""
+                UPDATE carteira
+                SET quantidade = ?, preco_atual = ?, valor_total = ?, tipo = ?,
+                    dy = ?, pl = ?, pvp = ?, roe = ?
+                WHERE id = ?
+            """, (nova_qtd, preco_atual, novo_valor_total, tipo,
+                  dy, pl, pvp, roe, id_existente))
+        else:
+            valor_total = preco_atual * quantidade
+            conn.execute("""
+                INSERT INTO carteira 
+                    (ticker, nome_completo, quantidade, preco_atual, valor_total, 
+                     data_adicao, tipo, dy, pl, pvp, roe)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (ticker, nome_completo, quantidade, preco_atual, valor_total,
+                  date.today().isoformat(), tipo, dy, pl, pvp, roe))
+
     salvar_historico()
 
     registrar_movimentacao(
@@ -142,47 +154,79 @@ def adicionar_ou_atualizar_ativo(ticker, nome_completo, quantidade, preco_atual,
 
 
 def atualizar_ativo(id, quantidade):
-    conn = sqlite3.connect('carteira.db', check_same_thread=False)
-    cursor = conn.cursor()
-    cursor.execute("SELECT preco_atual FROM carteira WHERE id = ?", (id,))
-    preco_atual = cursor.fetchone()[0]
-    valor_total = preco_atual * quantidade
-    cursor.execute("UPDATE carteira SET quantidade = ?, valor_total = ? WHERE id = ?", (quantidade, valor_total, id))
-    conn.commit()
-    conn.close()
+    with transacao(CARTEIRA_DB_PATH) as conn:
+        preco_atual = conn.execute("SELECT preco_atual FROM carteira WHERE id = ?", (id,)).fetchone()[0]
+        valor_total = preco_atual * quantidade
+        conn.execute("UPDATE carteira SET quantidade = ?, valor_total = ? WHERE id = ?", (quantidade, valor_total, id))
     salvar_historico()
 
 
 def remover_ativo(id):
-    conn = sqlite3.connect('carteira.db', check_same_thread=False)
-    cursor = conn.cursor()
+    aplicar_edicoes_carteira([id], [])
 
-    cursor.execute("SELECT ticker, nome_completo, quantidade, preco_atual FROM carteira WHERE id = ?", (id,))
-    ativo = cursor.fetchone()
-    if ativo:
-        ticker, nome_completo, quantidade, preco_atual = ativo
-    else:
-        ticker = nome_completo = quantidade = preco_atual = None
-    cursor.execute("DELETE FROM carteira WHERE id = ?", (id,))
-    conn.commit()
-    conn.close()
-    salvar_historico()
 
-    if ativo:
-        registrar_movimentacao(
-            data=date.today().isoformat(),
-            ticker=ticker,
-            nome_completo=nome_completo,
-            quantidade=quantidade,
-            preco=preco_atual,
-            tipo='venda'
-        )
+def quantidade_valida(valor):
+    try:
+        quantidade = float(valor)
+    except (TypeError, ValueError):
+        return None
+    return quantidade if 0 < quantidade < float("inf") else None
+
+
+def posicoes_por_id(conn, ids):
+    if not ids:
+        return {}
+    linhas = conn.execute(
+        f"SELECT id, ticker, nome_completo, quantidade, preco_atual FROM carteira WHERE id IN ({', '.join('?' * len(ids))})",
+        list(ids)
+    ).fetchall()
+    return {linha[0]: linha[1:] for linha in linhas}
+
+
+def aplicar_edicoes_carteira(removidos, atualizados):
+    # Remoções e edições de quantidade/tipo da tabela em uma única transação, com as movimentações
+    # correspondentes e o histórico do dia. Linhas com quantidade ou tipo inválidos são ignoradas;
+    # devolve quantas foram ignoradas
+    hoje = date.today().isoformat()
+    remocoes, atualizacoes, movimentacoes, ignoradas = [], [], [], 0
+    with transacao(CARTEIRA_DB_PATH) as conn:
+        for id_, (ticker, nome_completo, quantidade, preco_atual) in posicoes_por_id(conn, removidos).items():
+            remocoes.append((id_,))
+            movimentacoes.append((hoje, ticker, nome_completo, quantidade, preco_atual, 'venda'))
+
+        anteriores = posicoes_por_id(conn, [linha.get('id') for linha in atualizados])
+        for linha in atualizados:
+            quantidade = quantidade_valida(linha.get('quantidade'))
+            anterior = anteriores.get(linha.get('id'))
+            if quantidade is None or not linha.get('tipo') or anterior is None:
+                ignoradas += 1
+                continue
+            ticker, nome_completo, quantidade_anterior, preco_atual = anterior
+            atualizacoes.append((quantidade, linha['tipo'], preco_atual * quantidade, linha['id']))
+            # Mudança de quantidade na tabela equivale a uma compra ou venda da diferença
+            if quantidade != quantidade_anterior:
+                tipo_movimentacao = 'compra' if quantidade > quantidade_anterior else 'venda'
+                movimentacoes.append((hoje, ticker, nome_completo, abs(quantidade - quantidade_anterior), preco_atual, tipo_movimentacao))
+
+        if not remocoes and not atualizacoes:
+            return ignoradas
+        conn.executemany("DELETE FROM carteira WHERE id = ?", remocoes)
+        conn.executemany("UPDATE carteira SET quantidade = ?, tipo = ?, valor_total = ? WHERE id = ?", atualizacoes)
+        conn.executemany('''
+            INSERT INTO movimentacoes (data, ticker, nome_completo, quantidade, preco, tipo)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', movimentacoes)
+        gravar_historico(conn)
+    invalidar_grupo("carteira")
+    return ignoradas
+
+
+def versao_carteira():
+    return consultar_um(CARTEIRA_DB_PATH, "SELECT versao FROM carteira_versao WHERE id = 1")[0]
 
 
 def consultar_carteira():
-    conn = sqlite3.connect('carteira.db', check_same_thread=False)
-    df = pd.read_sql_query("SELECT * FROM carteira", conn)
-    conn.close()
+    df = pd.read_sql_query("SELECT * FROM carteira", conexao(CARTEIRA_DB_PATH))
 
  
 
@@ -190,30 +234,33 @@ def consultar_carteira():
 
 
 
-def salvar_historico():
-    df = pd.DataFrame(consultar_carteira())
-    valor_total = df['valor_total'].sum() if not df.empty else 0
+def gravar_historico(conn):
+    valor_total = conn.execute("SELECT COALESCE(SUM(valor_total), 0) FROM carteira").fetchone()[0]
     data_hoje = date.today().isoformat()
-
-    conn = sqlite3.connect('carteira.db', check_same_thread=False)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM historico_carteira WHERE data = ?", (data_hoje,))
-    existe = cursor.fetchone()
+    existe = conn.execute("SELECT id FROM historico_carteira WHERE data = ?", (data_hoje,)).fetchone()
     if existe:
-        cursor.execute("UPDATE historico_carteira SET valor_total = ? WHERE data = ?", (valor_total, data_hoje))
+        conn.execute("UPDATE historico_carteira SET valor_total = ? WHERE data = ?", (valor_total, data_hoje))
     else:
-        cursor.execute("INSERT INTO historico_carteira (data, valor_total) VALUES (?, ?)", (data_hoje, valor_total))
-    conn.commit()
-    conn.close()
+        conn.execute("INSERT INTO historico_carteira (data, valor_total) VALUES (?, ?)", (data_hoje, valor_total))
+
+
+def salvar_historico():
+    with transacao(CARTEIRA_DB_PATH) as conn:
+        gravar_historico(conn)
+    # Toda escrita na carteira termina aqui: descarta histórico e insights calculados
+    invalidar_grupo("carteira")
 
 
 def consultar_historico(periodo):
-    conn = sqlite3.connect('carteira.db', check_same_thread=False)
-    df = pd.read_sql_query("SELECT * FROM historico_carteira", conn)
-    conn.close()
+    return historico_do_periodo(periodo, date.today().isoformat())
+
+
+@memoizar(grupos=["carteira"])
+def historico_do_periodo(periodo, hoje):
+    df = pd.read_sql_query("SELECT * FROM historico_carteira", conexao(CARTEIRA_DB_PATH))
     df['data'] = pd.to_datetime(df['data'])
 
-    hoje = pd.to_datetime(date.today())
+    hoje = pd.to_datetime(hoje)
     if periodo == 'semanal':
         inicio = hoje - pd.DateOffset(weeks=1)
     elif periodo == 'mensal':
@@ -229,11 +276,8 @@ def consultar_historico(periodo):
     return df[df['data'] >= inicio]
 
 def editar_tipo(id, novo_tipo):
-    conn = sqlite3.connect('carteira.db', check_same_thread=False)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE carteira SET tipo = ? WHERE id = ?", (novo_tipo, id))
-    conn.commit()
-    conn.close()
+    executar(CARTEIRA_DB_PATH, "UPDATE carteira SET tipo = ? WHERE id = ?", (novo_tipo, id))
+    invalidar_grupo("carteira")
 
 
 
@@ -265,6 +309,7 @@ def registrar_callbacks(app):
         [Input("carteira-tabs", "active_tab"), Input("switch-darkmode", "value")]
     )
     def carteira_renderizar_abas(aba, is_dark):
+        import plotly.express as px
         style_header_dark = {
             'backgroundColor': '#202124',
             'color': '#E4E6EB',
@@ -543,8 +588,7 @@ def registrar_callbacks(app):
                 nome = row['nome_completo']
                 qtd = row['quantidade']
                 try:
-                    yf_ticker = yf.Ticker(ticker)
-                    dividends = yf_ticker.dividends
+                    dividends = obter_dividendos(ticker)
                     if dividends.empty:
                         continue
                     df_div = dividends.reset_index()
@@ -713,16 +757,21 @@ def registrar_callbacks(app):
             'bdr': data_bdr,
             'fixa': data_fixa
         }
+        removidos, atualizados = [], []
         for tipo, prev in tipo_map.items():
             atual = data_map[tipo]
-            if prev is not None and atual is not None:
-                prev_ids = {row['id'] for row in prev if 'id' in row}
-                atual_ids = {row['id'] for row in atual if 'id' in row}
-                removidos = prev_ids - atual_ids
-                for id_removido in removidos:
-                    remover_ativo(id_removido)
-                if removidos:
-                    mensagem = "🗑️ Ativo(s) removido(s)."
+            if prev is not None and atual is not None and edicao_da_tabela(f'tabela-carteira-{tipo}'):
+                diferenca = diferenca_tabelas(prev, atual, ['quantidade', 'tipo'], {'quantidade': float})
+                removidos += diferenca.removidos
+                atualizados += diferenca.atualizados
+        if removidos or atualizados:
+            ignoradas = aplicar_edicoes_carteira(removidos, atualizados)
+            if removidos:
+                mensagem = "🗑️ Ativo(s) removido(s)."
+            elif len(atualizados) > ignoradas:
+                mensagem = "✏️ Ativo(s) atualizado(s)."
+            if ignoradas:
+                mensagem = f"{mensagem} ⚠️ {ignoradas} edição(ões) com quantidade inválida não salva(s).".strip()
  
         df_carteira = pd.DataFrame(consultar_carteira())
         tipos_ativos = ['Ação', 'FII', 'Criptomoeda', 'BDR', 'Fixa']
@@ -834,6 +883,7 @@ def registrar_callbacks(app):
     [Input("carteira-filtro-periodo", "value"), Input("switch-darkmode", "value")]
 )
     def carteira_atualizar_graficos(periodo, is_dark):
+        import plotly.express as px
         df_hist = consultar_historico(periodo)
         df_carteira = pd.DataFrame(consultar_carteira())
 
@@ -858,7 +908,7 @@ def registrar_callbacks(app):
             }
             for ticker, nome in tickers.items():
                 try:
-                    dados = yf.Ticker(ticker).history(start=data_inicio, end=data_fim)
+                    dados = obter_historico(ticker, start=data_inicio, end=data_fim)
                     if not dados.empty:
                         dados = dados["Close"]
                         dados_normalizado = dados / dados.iloc[0] * 100
@@ -910,45 +960,102 @@ def registrar_callbacks(app):
     
 
 def registrar_movimentacao(data, ticker, nome_completo, quantidade, preco, tipo):
-    conn = sqlite3.connect('carteira.db', check_same_thread=False)
-    cursor = conn.cursor()
-    cursor.execute('''
+    executar(CARTEIRA_DB_PATH, '''
         INSERT INTO movimentacoes (data, ticker, nome_completo, quantidade, preco, tipo)
         VALUES (?, ?, ?, ?, ?, ?)
     ''', (data, ticker, nome_completo, quantidade, preco, tipo))
-    conn.commit()
-    conn.close()
 
 
 def consultar_movimentacoes(mes=None, ano=None):
-    conn = sqlite3.connect('carteira.db', check_same_thread=False)
     query = 'SELECT * FROM movimentacoes'
     params = []
     if mes and ano:
-        query += ' WHERE strftime("%m", data) = ? AND strftime("%Y", data) = ?'
-        params = [str(mes).zfill(2), str(ano)]
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
+        query += ' WHERE data >= ? AND data < ?'
+        params = list(intervalo_mes(mes, ano))
+    df = pd.read_sql_query(query, conexao(CARTEIRA_DB_PATH), params=params)
     return df
 
 
 
+TAMANHO_LOTE_COTACOES = 50
+MAX_WORKERS_COTACOES = 4
+TIMEOUT_COTACOES = 15
+
+
+def ultimo_fechamento(df, ticker):
+    # yf.download devolve colunas (ticker, campo) com vários tickers e, em versões antigas, só o campo com um ticker
+    if isinstance(df.columns, pd.MultiIndex):
+        if ticker not in df.columns.get_level_values(0):
+            return None
+        fechamentos = df[ticker]['Close']
+    elif 'Close' in df.columns:
+        fechamentos = df['Close']
+    else:
+        return None
+    fechamentos = fechamentos.dropna()
+    return float(fechamentos.iloc[-1]) if not fechamentos.empty else None
+
+
+def baixar_lote_cotacoes(tickers):
+    import yfinance as yf
+    try:
+        df = yf.download(
+            tickers, period="5d", interval="1d", group_by="ticker", auto_adjust=False,
+            threads=True, progress=False, timeout=TIMEOUT_COTACOES
+        )
+    except Exception as e:
+        print(f"Erro ao baixar cotações em lote: {e}")
+        return {}
+    if df is None or df.empty:
+        return {}
+    if len(tickers) == 1 and not isinstance(df.columns, pd.MultiIndex):
+        preco = ultimo_fechamento(df, tickers[0])
+        return {tickers[0]: preco} if preco else {}
+    precos = {ticker: ultimo_fechamento(df, ticker) for ticker in tickers}
+    return {ticker: preco for ticker, preco in precos.items() if preco}
+
+
+def obter_precos_em_lote(tickers):
+    # Fechamento mais recente de cada ticker, em lotes de TAMANHO_LOTE_COTACOES baixados um após o outro.
+    # yf.download já paraleliza dentro do lote (threads=True), mas guarda os resultados em um dicionário
+    # global do módulo (shared._DFS) que cada chamada zera: lotes simultâneos apagam os dados uns dos outros
+    tickers = list(dict.fromkeys(tickers))
+    precos = {}
+    for i in range(0, len(tickers), TAMANHO_LOTE_COTACOES):
+        precos.update(baixar_lote_cotacoes(tickers[i:i + TAMANHO_LOTE_COTACOES]))
+    return precos
+
+
 def atualizar_precos_carteira():
-    conn = sqlite3.connect('carteira.db', check_same_thread=False)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, ticker, quantidade FROM carteira")
-    ativos = cursor.fetchall()
-    for id_, ticker, quantidade in ativos:
-        info = obter_informacoes_ativo(ticker)
-        if info and info['preco_atual']:
-            preco_atual = info['preco_atual']
-            valor_total = preco_atual * quantidade
-            cursor.execute(
-                "UPDATE carteira SET preco_atual = ?, valor_total = ? WHERE id = ?",
-                (preco_atual, valor_total, id_)
-            )
-    conn.commit()
-    conn.close()
+    ativos = consultar(CARTEIRA_DB_PATH, "SELECT id, ticker, quantidade, tipo FROM carteira")
+    precos = obter_precos_em_lote([ticker for _, ticker, _, _ in ativos])
+    criptos = {ticker for _, ticker, _, tipo in ativos if tipo == "Criptomoeda"} & precos.keys()
+    if criptos:
+        cotacao_dolar = obter_cotacao_dolar()
+        for ticker in criptos:
+            precos[ticker] *= cotacao_dolar
+
+    # Quem não veio no download em lote cai no caminho antigo (.info, já em BRL), também em paralelo
+    faltantes = list(dict.fromkeys(ticker for _, ticker, _, _ in ativos if ticker not in precos))
+    if faltantes:
+        print(f"⚠️ {len(faltantes)} ativos sem cotação no lote, buscando individualmente...")
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS_COTACOES) as executor:
+            for ticker, info in zip(faltantes, executor.map(obter_informacoes_ativo, faltantes)):
+                if info and info['preco_atual']:
+                    precos[ticker] = info['preco_atual']
+
+    atualizacoes = []
+    for id_, ticker, quantidade, _ in ativos:
+        preco_atual = precos.get(ticker)
+        if not preco_atual:
+            continue
+        atualizacoes.append((preco_atual, preco_atual * quantidade, id_))
+    # As cotações são buscadas fora da transação para não segurar o lock de escrita
+    executar_varios(
+        CARTEIRA_DB_PATH,
+        "UPDATE carteira SET preco_atual = ?, valor_total = ? WHERE id = ?",
+        atualizacoes
+    )
     salvar_historico()
 
 
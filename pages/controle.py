@@ -1,130 +1,175 @@
-import sqlite3
 import dash
 import pandas as pd
 from datetime import date
 from dash import html, dcc, Input, Output, State
 import dash_bootstrap_components as dbc
 from dash import dash_table
-import plotly.express as px
+from banco import conexao, transacao, executar, consultar_um, intervalo_mes
+from diferencas import diferenca_tabelas, aplicar_diferenca, edicao_da_tabela
+from cache_compartilhado import memoizar
+
+FINANCEIRO_DB_PATH = 'financeiro.db'
 
 
 
 def init_db():
-    conn = sqlite3.connect('financeiro.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS receitas (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            valor REAL NOT NULL,
-            data TEXT NOT NULL
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS cartoes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome TEXT,
-            valor REAL,
-            pago TEXT,
-            quem_usou TEXT,
-            data TEXT NOT NULL
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS outros_gastos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome TEXT,
-            valor REAL,
-            data TEXT NOT NULL
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    with transacao(FINANCEIRO_DB_PATH) as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS receitas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                valor REAL NOT NULL,
+                data TEXT NOT NULL
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS cartoes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nome TEXT,
+                valor REAL,
+                pago TEXT,
+                quem_usou TEXT,
+                data TEXT NOT NULL
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS outros_gastos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nome TEXT,
+                valor REAL,
+                data TEXT NOT NULL
+            )
+        ''')
+        # Versão dos lançamentos: incrementada por trigger a cada escrita (invalida os resumos em cache)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS controle_versao (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                versao INTEGER NOT NULL
+            )
+        ''')
+        conn.execute("INSERT OR IGNORE INTO controle_versao (id, versao) VALUES (1, 0)")
+        for tabela in ("receitas", "cartoes", "outros_gastos"):
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{tabela}_data ON {tabela}(data)")
+            for operacao in ("INSERT", "UPDATE", "DELETE"):
+                conn.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_{tabela}_{operacao.lower()}_versao
+                    AFTER {operacao} ON {tabela}
+                    BEGIN
+                        UPDATE controle_versao SET versao = versao + 1 WHERE id = 1;
+                    END
+                ''')
+        criar_resumos(conn)
+
+
+# Resumos materializados (diário e mensal) por categoria, quem_usou e pago, mantidos por triggers
+LANCAMENTOS = {
+    "receitas": ("receita", "''", "''"),
+    "cartoes": ("cartao", "COALESCE({linha}.quem_usou, '')", "COALESCE({linha}.pago, '')"),
+    "outros_gastos": ("outro", "''", "''"),
+}
+RESUMOS = {
+    "resumo_diario": "substr({linha}.data, 1, 10)",
+    "resumo_mensal": "substr({linha}.data, 1, 7)",
+}
+
+
+def sql_aplicar_no_resumo(resumo, tabela, linha, sinal):
+    categoria, quem_usou, pago = LANCAMENTOS[tabela]
+    chave = [RESUMOS[resumo].format(linha=linha), f"'{categoria}'", quem_usou.format(linha=linha), pago.format(linha=linha)]
+    return f'''
+        INSERT INTO {resumo} (periodo, categoria, quem_usou, pago, total, quantidade)
+        VALUES ({", ".join(chave)}, {sinal}COALESCE({linha}.valor, 0), {sinal}1)
+        ON CONFLICT(periodo, categoria, quem_usou, pago) DO UPDATE SET
+            total = total + excluded.total, quantidade = quantidade + excluded.quantidade;
+        DELETE FROM {resumo}
+        WHERE periodo = {chave[0]} AND categoria = {chave[1]} AND quem_usou = {chave[2]} AND pago = {chave[3]}
+          AND quantidade <= 0;
+    '''
+
+
+def reconstruir_resumos(conn):
+    for resumo, periodo in RESUMOS.items():
+        conn.execute(f"DELETE FROM {resumo}")
+        for tabela, (categoria, quem_usou, pago) in LANCAMENTOS.items():
+            conn.execute(f'''
+                INSERT INTO {resumo} (periodo, categoria, quem_usou, pago, total, quantidade)
+                SELECT {periodo.format(linha=tabela)}, '{categoria}', {quem_usou.format(linha=tabela)},
+                       {pago.format(linha=tabela)}, SUM(COALESCE(valor, 0)), COUNT(*)
+                FROM {tabela}
+                GROUP BY 1, 3, 4
+            ''')
+
+
+def criar_resumos(conn):
+    existentes = {linha[0] for linha in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for resumo in RESUMOS:
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {resumo} (
+                periodo TEXT NOT NULL,
+                categoria TEXT NOT NULL,
+                quem_usou TEXT NOT NULL,
+                pago TEXT NOT NULL,
+                total REAL NOT NULL,
+                quantidade INTEGER NOT NULL,
+                PRIMARY KEY (periodo, categoria, quem_usou, pago)
+            ) WITHOUT ROWID
+        ''')
+    for tabela in LANCAMENTOS:
+        corpos = {
+            "INSERT": [("NEW", "+")],
+            "UPDATE": [("OLD", "-"), ("NEW", "+")],
+            "DELETE": [("OLD", "-")],
+        }
+        for operacao, aplicacoes in corpos.items():
+            corpo = "".join(
+                sql_aplicar_no_resumo(resumo, tabela, linha, sinal)
+                for linha, sinal in aplicacoes for resumo in RESUMOS
+            )
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{tabela}_{operacao.lower()}_resumo
+                AFTER {operacao} ON {tabela}
+                BEGIN
+                    {corpo}
+                END
+            ''')
+    # Migração: bancos existentes ganham os resumos a partir dos lançamentos já gravados
+    if not set(RESUMOS) <= existentes:
+        reconstruir_resumos(conn)
+
 
 init_db()
 
 
 def salvar_receita(valor):
 
-    conn = sqlite3.connect('financeiro.db')
-    cursor = conn.cursor()
-    cursor.execute("""
+    executar(FINANCEIRO_DB_PATH, """
         INSERT INTO receitas (valor, data) VALUES (?, ?)
     """, (valor, date.today().isoformat()))
-    conn.commit()
-    conn.close()
 
 def adicionar_cartao(nome, valor, pago, quem_usou):
 
-    conn = sqlite3.connect('financeiro.db')
-    cursor = conn.cursor()
-    cursor.execute("""
+    executar(FINANCEIRO_DB_PATH, """
         INSERT INTO cartoes (nome, valor, pago, quem_usou, data)
         VALUES (?, ?, ?, ?, ?)
     """, (nome, valor, pago, quem_usou, date.today().isoformat()))
-    conn.commit()
-    conn.close()
 
 def adicionar_outro_gasto(nome, valor):
 
-    conn = sqlite3.connect('financeiro.db')
-    cursor = conn.cursor()
-    cursor.execute("""
+    executar(FINANCEIRO_DB_PATH, """
         INSERT INTO outros_gastos (nome, valor, data)
         VALUES (?, ?, ?)
     """, (nome, valor, date.today().isoformat()))
-    conn.commit()
-    conn.close()
-
-def remover_cartao(id_registro):
-    conn = sqlite3.connect("financeiro.db")
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM cartoes WHERE id = ?", (id_registro,))
-    conn.commit()
-    conn.close()
-
-def remover_outro_gasto(id_registro):
-    conn = sqlite3.connect("financeiro.db")
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM outros_gastos WHERE id = ?", (id_registro,))
-    conn.commit()
-    conn.close()
-
-def atualizar_cartao(id_registro, nome, valor, pago, quem_usou):
-    conn = sqlite3.connect("financeiro.db")
-    cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE cartoes
-        SET nome = ?, valor = ?, pago = ?, quem_usou = ?
-        WHERE id = ?
-    """, (nome, valor, pago, quem_usou, id_registro))
-    conn.commit()
-    conn.close()
-
-def atualizar_outro_gasto(id_registro, nome, valor):
-    conn = sqlite3.connect("financeiro.db")
-    cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE outros_gastos
-        SET nome = ?, valor = ?
-        WHERE id = ?
-    """, (nome, valor, id_registro))
-    conn.commit()
-    conn.close()
 
 def carregar_cartoes_mes_ano(mes, ano):
     if not mes:
         mes = str(date.today().month).zfill(2)
     if not ano:
         ano = str(date.today().year)
-    conn = sqlite3.connect("financeiro.db")
     query = """
         SELECT id, nome, valor, pago, quem_usou, data
         FROM cartoes
-        WHERE strftime('%m', data) = ?
-          AND strftime('%Y', data) = ?
+        WHERE data >= ? AND data < ?
     """
-    df = pd.read_sql_query(query, conn, params=[str(mes).zfill(2), str(ano)])
-    conn.close()
+    df = pd.read_sql_query(query, conexao(FINANCEIRO_DB_PATH), params=intervalo_mes(mes, ano))
     return df.to_dict("records")
 
 def carregar_outros_mes_ano(mes, ano):
@@ -132,15 +177,12 @@ def carregar_outros_mes_ano(mes, ano):
         mes = str(date.today().month).zfill(2)
     if not ano:
         ano = str(date.today().year)
-    conn = sqlite3.connect("financeiro.db")
     query = """
         SELECT id, nome, valor, data
         FROM outros_gastos
-        WHERE strftime('%m', data) = ?
-          AND strftime('%Y', data) = ?
+        WHERE data >= ? AND data < ?
     """
-    df = pd.read_sql_query(query, conn, params=[str(mes).zfill(2), str(ano)])
-    conn.close()
+    df = pd.read_sql_query(query, conexao(FINANCEIRO_DB_PATH), params=intervalo_mes(mes, ano))
     return df.to_dict("records")
 
 def carregar_receitas_mes_ano(mes, ano):
@@ -148,35 +190,108 @@ def carregar_receitas_mes_ano(mes, ano):
         mes = str(date.today().month).zfill(2)
     if not ano:
         ano = str(date.today().year)
-    conn = sqlite3.connect("financeiro.db")
     query = """
         SELECT id, valor, data
         FROM receitas
-        WHERE strftime('%m', data) = ?
-          AND strftime('%Y', data) = ?
+        WHERE data >= ? AND data < ?
     """
-    df = pd.read_sql_query(query, conn, params=[str(mes).zfill(2), str(ano)])
-    conn.close()
+    df = pd.read_sql_query(query, conexao(FINANCEIRO_DB_PATH), params=intervalo_mes(mes, ano))
     return df
 
+CONSULTA_RESUMO_MES = """
+    SELECT
+        COALESCE(SUM(CASE WHEN categoria = 'receita' THEN total END), 0),
+        COALESCE(SUM(CASE WHEN categoria = 'cartao' AND pago = 'Sim' AND quem_usou = 'Mateus' THEN total END), 0),
+        COALESCE(SUM(CASE WHEN categoria = 'cartao' AND pago = 'Sim' THEN total END), 0),
+        COALESCE(SUM(CASE WHEN categoria = 'cartao' THEN total END), 0),
+        COALESCE(SUM(CASE WHEN categoria = 'outro' THEN total END), 0)
+    FROM resumo_mensal
+    WHERE periodo = :periodo
+"""
+
+
+def versao_lancamentos():
+    return consultar_um(FINANCEIRO_DB_PATH, "SELECT versao FROM controle_versao WHERE id = 1")[0]
+
+
+def mes_ano_ou_atual(mes, ano):
+    if not mes:
+        mes = str(date.today().month).zfill(2)
+    if not ano:
+        ano = str(date.today().year)
+    return int(mes), int(ano)
+
+
+def periodo_mes(mes, ano):
+    mes, ano = mes_ano_ou_atual(mes, ano)
+    return f"{ano:04d}-{mes:02d}"
+
+
+# Os agregados entram no cache com a versão de controle_versao na chave: qualquer escrita
+# (os gatilhos incrementam a versão) invalida o resultado em todos os workers
+def resumo_mes_ano(mes, ano):
+    return resumo_do_periodo(periodo_mes(mes, ano), versao_lancamentos())
+
+
+@memoizar()
+def resumo_do_periodo(periodo, versao):
+    receitas, cartoes, cartoes_pagos, cartoes_total, outros = consultar_um(
+        FINANCEIRO_DB_PATH, CONSULTA_RESUMO_MES, {"periodo": periodo}
+    )
+    return {
+        "receitas": receitas,
+        "gastos_cartao": cartoes,
+        "gastos_cartao_pagos": cartoes_pagos,
+        "gastos_cartao_total": cartoes_total,
+        "gastos_outros": outros,
+        "saldo": receitas - cartoes - outros,
+    }
+
+
 def calcular_saldo_mes_ano(mes, ano):
 
-    df_receitas = carregar_receitas_mes_ano(mes, ano)
-    total_receita = df_receitas['valor'].sum() if not df_receitas.empty else 0
+    return resumo_mes_ano(mes, ano)["saldo"]
+
 
-    df_cartoes = pd.DataFrame(carregar_cartoes_mes_ano(mes, ano))
-    gastos_cartao = 0
-    if not df_cartoes.empty:
-        gastos_cartao = df_cartoes[
-            (df_cartoes['pago'] == 'Sim') & (df_cartoes['quem_usou'] == 'Mateus')
-        ]['valor'].sum()
+def totais_diarios_mes_ano(mes, ano):
+    return totais_diarios_do_periodo(periodo_mes(mes, ano), versao_lancamentos())
 
-    df_outros = pd.DataFrame(carregar_outros_mes_ano(mes, ano))
-    gastos_outros = df_outros['valor'].sum() if not df_outros.empty else 0
 
-    return total_receita - gastos_cartao - gastos_outros
+@memoizar()
+def totais_diarios_do_periodo(periodo, versao):
+    inicio, fim = intervalo_mes(periodo[5:], periodo[:4])
+    query = """
+        SELECT periodo AS data,
+               SUM(CASE WHEN categoria = 'receita' THEN total ELSE 0 END) AS receitas,
+               SUM(CASE WHEN categoria != 'receita' THEN total ELSE 0 END) AS despesas
+        FROM resumo_diario
+        WHERE periodo >= ? AND periodo < ?
+        GROUP BY periodo
+    """
+    return pd.read_sql_query(query, conexao(FINANCEIRO_DB_PATH), params=(inicio, fim))
 
 
+def cartoes_por_pessoa_mes_ano(mes, ano):
+    return cartoes_por_pessoa_do_periodo(periodo_mes(mes, ano), versao_lancamentos())
+
+
+@memoizar()
+def cartoes_por_pessoa_do_periodo(periodo, versao):
+    query = """
+        SELECT quem_usou, SUM(total) AS valor
+        FROM resumo_mensal
+        WHERE periodo = ? AND categoria = 'cartao' AND quem_usou != ''
+        GROUP BY quem_usou
+    """
+    return pd.read_sql_query(query, conexao(FINANCEIRO_DB_PATH), params=(periodo,))
+
+
+
+# Colunas editáveis nas tabelas de lançamentos (comparadas e gravadas pelo diff)
+COLUNAS_CARTOES = ["nome", "valor", "pago", "quem_usou"]
+COLUNAS_OUTROS = ["nome", "valor"]
+CONVERSORES_LANCAMENTOS = {"valor": float}
+
 
 def registrar_callbacks(app):
 
@@ -204,35 +319,13 @@ def registrar_callbacks(app):
             status_msg = "✅ Cartão adicionado."
 
 
-        if data_previous:
-            df_prev = pd.DataFrame(data_previous)
-            df_new = pd.DataFrame(data_atual)
-
-
-            if len(df_prev) > len(df_new):
-                removidos = df_prev[~df_prev['id'].isin(df_new['id'])]
-                for _, row in removidos.iterrows():
-                    remover_cartao(row['id'])
+        if data_previous and edicao_da_tabela('tabela-cartoes'):
+            diferenca = diferenca_tabelas(data_previous, data_atual, COLUNAS_CARTOES, CONVERSORES_LANCAMENTOS)
+            aplicar_diferenca(FINANCEIRO_DB_PATH, "cartoes", diferenca, COLUNAS_CARTOES, CONVERSORES_LANCAMENTOS)
+            if diferenca.removidos:
                 status_msg = "🗑️ Cartão removido."
-
-
-            for i in df_new.index:
-                atual = df_new.loc[i]
-                antigo = df_prev[df_prev['id'] == atual['id']]
-                if not antigo.empty:
-                    antigo = antigo.iloc[0]
-                    if (antigo['nome'] != atual['nome']
-                        or float(antigo['valor']) != float(atual['valor'])
-                        or antigo['pago'] != atual['pago']
-                        or antigo['quem_usou'] != atual['quem_usou']):
-                        atualizar_cartao(
-                            atual['id'],
-                            atual['nome'],
-                            float(atual['valor']),
-                            atual['pago'],
-                            atual['quem_usou']
-                        )
-                        status_msg = "✏️ Cartão atualizado."
+            if diferenca.atualizados:
+                status_msg = "✏️ Cartão atualizado."
 
 
         if mes and ano:
@@ -263,30 +356,13 @@ def registrar_callbacks(app):
             status_msg = "✅ Gasto adicionado."
 
 
-        if data_previous:
-            df_prev = pd.DataFrame(data_previous)
-            df_new = pd.DataFrame(data_atual)
-            if len(df_prev) > len(df_new):
-
-                removidos = df_prev[~df_prev['id'].isin(df_new['id'])]
-                for _, row in removidos.iterrows():
-                    remover_outro_gasto(row['id'])
+        if data_previous and edicao_da_tabela('tabela-outros'):
+            diferenca = diferenca_tabelas(data_previous, data_atual, COLUNAS_OUTROS, CONVERSORES_LANCAMENTOS)
+            aplicar_diferenca(FINANCEIRO_DB_PATH, "outros_gastos", diferenca, COLUNAS_OUTROS, CONVERSORES_LANCAMENTOS)
+            if diferenca.removidos:
                 status_msg = "🗑️ Gasto removido."
-
-
-            for i in df_new.index:
-                atual = df_new.loc[i]
-                antigo = df_prev[df_prev['id'] == atual['id']]
-                if not antigo.empty:
-                    antigo = antigo.iloc[0]
-                    if (antigo['nome'] != atual['nome']
-                        or float(antigo['valor']) != float(atual['valor'])):
-                        atualizar_outro_gasto(
-                            atual['id'],
-                            atual['nome'],
-                            float(atual['valor'])
-                        )
-                        status_msg = "✏️ Gasto atualizado."
+            if diferenca.atualizados:
+                status_msg = "✏️ Gasto atualizado."
 
 
         if mes and ano:
@@ -325,16 +401,13 @@ def registrar_callbacks(app):
     @app.callback(
     Output("total-por-pessoa", "children"),
     [Input("tabela-cartoes", "data"),
-     Input("tabela-outros", "data")]
+     Input("tabela-outros", "data"),
+     Input("filtro-mes", "value"),
+     Input("filtro-ano", "value")]
 )
-    def agrupar_por_pessoa(cartoes_data, outros_data):
-        df_cartoes = pd.DataFrame(cartoes_data)
-        df_outros = pd.DataFrame(outros_data)
-        if not df_cartoes.empty and 'quem_usou' in df_cartoes.columns:
-            grupo_cartoes = df_cartoes.groupby("quem_usou")["valor"].sum().reset_index()
-        else:
-            grupo_cartoes = pd.DataFrame(columns=["quem_usou", "valor"])
-        total_outros = df_outros["valor"].sum() if not df_outros.empty else 0
+    def agrupar_por_pessoa(cartoes_data, outros_data, mes, ano):
+        grupo_cartoes = cartoes_por_pessoa_mes_ano(mes, ano)
+        total_outros = resumo_mes_ano(mes, ano)["gastos_outros"]
         if "Mateus" in grupo_cartoes["quem_usou"].values:
             grupo_cartoes.loc[grupo_cartoes["quem_usou"] == "Mateus", "valor"] += total_outros
         else:
@@ -358,6 +431,7 @@ def registrar_callbacks(app):
          Input("switch-darkmode", "value")]
     )
     def atualizar_grafico(mes, ano, cartoes_data, outros_data, is_dark):
+        import plotly.express as px
         template = 'plotly_dark' if is_dark else 'simple_white'
         if is_dark:
             bg_color = "#18191A"
@@ -384,27 +458,14 @@ def registrar_callbacks(app):
             return fig
 
 
-        df_receita = carregar_receitas_mes_ano(mes, ano)
-        df_receita["data"] = pd.to_datetime(df_receita["data"])
-        df_receita_grouped = df_receita.groupby("data")["valor"].sum().reset_index(name="receitas")
-
-
-        df_cartao = pd.DataFrame(cartoes_data)
-        df_outros = pd.DataFrame(outros_data)
-        df_cartao["data"] = pd.to_datetime(df_cartao["data"]) if not df_cartao.empty else pd.Series(dtype='datetime64[ns]')
-        df_outros["data"] = pd.to_datetime(df_outros["data"]) if not df_outros.empty else pd.Series(dtype='datetime64[ns]')
-        df_cartao_ = df_cartao[["data", "valor"]] if not df_cartao.empty else pd.DataFrame(columns=["data", "valor"])
-        df_outros_ = df_outros[["data", "valor"]] if not df_outros.empty else pd.DataFrame(columns=["data", "valor"])
-        df_despesas = pd.concat([df_cartao_, df_outros_]) if not df_cartao_.empty or not df_outros_.empty else pd.DataFrame(columns=["data", "valor"])
-        if df_despesas.empty:
-            df_despesas_grouped = pd.DataFrame({"data": [], "despesas": []})
-        else:
-            df_despesas_grouped = df_despesas.groupby("data")["valor"].sum().reset_index(name="despesas")
+        # Totais por dia vêm do resumo materializado (resumo_diario)
+        df_diario = totais_diarios_mes_ano(mes, ano)
+        df_diario["data"] = pd.to_datetime(df_diario["data"])
 
 
         dias = pd.date_range(start=f"{ano}-{mes.zfill(2)}-01", end=pd.Timestamp(f"{ano}-{mes.zfill(2)}-01") + pd.offsets.MonthEnd(0))
         df_base = pd.DataFrame({"data": dias})
-        df_merged = pd.merge(df_base, df_receita_grouped, on="data", how="left").merge(df_despesas_grouped, on="data", how="left")
+        df_merged = pd.merge(df_base, df_diario, on="data", how="left")
         df_merged["receitas"] = df_merged["receitas"].fillna(0)
         df_merged["despesas"] = df_merged["despesas"].fillna(0)
         df_merged["saldo_dia"] = df_merged["receitas"] - df_merged["despesas"]
@@ -427,9 +488,11 @@ def registrar_callbacks(app):
 
     @app.callback(
         Output("grafico-por-pessoa", "figure"),
-        [Input("tabela-cartoes", "data"), Input("switch-darkmode", "value")]
+        [Input("tabela-cartoes", "data"), Input("switch-darkmode", "value"),
+         Input("filtro-mes", "value"), Input("filtro-ano", "value")]
     )
-    def grafico_por_pessoa(cartoes_data, is_dark):
+    def grafico_por_pessoa(cartoes_data, is_dark, mes, ano):
+        import plotly.express as px
         template = 'plotly_dark' if is_dark else 'simple_white'
         if is_dark:
             bg_color = "#18191A"
@@ -441,7 +504,7 @@ def registrar_callbacks(app):
             paper_color = "#f8f9fa"
             font_color = "#222"
             legend_bg = "rgba(255,255,255,0.7)"
-        df = pd.DataFrame(cartoes_data)
+        df = cartoes_por_pessoa_mes_ano(mes, ano)
         if df.empty:
             fig = px.pie(title="Gastos por Pessoa", template=template)
         else:
@@ -466,6 +529,7 @@ def registrar_callbacks(app):
          Input("switch-darkmode", "value")]
     )
     def grafico_receitas_despesas(mes, ano, cartoes_data, outros_data, is_dark):
+        import plotly.express as px
         template = 'plotly_dark' if is_dark else 'simple_white'
         if is_dark:
             bg_color = "#18191A"
@@ -477,15 +541,9 @@ def registrar_callbacks(app):
             paper_color = "#f8f9fa"
             font_color = "#222"
             legend_bg = "rgba(255,255,255,0.7)"
-        df_receita = carregar_receitas_mes_ano(mes, ano)
-        df_cartao = pd.DataFrame(cartoes_data)
-        df_outros = pd.DataFrame(outros_data)
-        despesas = 0
-        if not df_cartao.empty:
-            despesas += df_cartao["valor"].sum()
-        if not df_outros.empty:
-            despesas += df_outros["valor"].sum()
-        total_receita = df_receita["valor"].sum() if not df_receita.empty else 0
+        resumo = resumo_mes_ano(mes, ano)
+        despesas = resumo["gastos_cartao_total"] + resumo["gastos_outros"]
+        total_receita = resumo["receitas"]
         df_bar = pd.DataFrame({
             "Categoria": ["Receitas", "Despesas"],
             "Valor": [total_receita, despesas]
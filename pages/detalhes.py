@@ -2,12 +2,11 @@ import dash
 from dash import html, dcc
 import dash_bootstrap_components as dbc
 from dash.dependencies import Input, Output, State
-import plotly.express as px
-import yfinance as yf
 from datetime import datetime, timedelta
 import pandas as pd
 from dash import dash_table
-from complete_b3_logos_mapping import add_logo_column_to_data, get_logo_url
+from complete_b3_logos_mapping import add_logo_column_to_data, get_logo_src
+from cache_cotacoes import obter_info, obter_historico, obter_dividendos
 
 
 
@@ -20,14 +19,10 @@ def buscar_detalhes_ativo(ticker):
     if '.' not in ticker and len(ticker) <= 6:
         ticker += '.SA'
     try:
-        acao = yf.Ticker(ticker)
-        info = acao.info or {}
-        historico = acao.history(period="max")
-        dividends = acao.dividends if hasattr(acao, 'dividends') else None
         return {
-            "info": info,
-            "historico": historico,
-            "dividends": dividends
+            "info": obter_info(ticker),
+            "historico": obter_historico(ticker, period="max"),
+            "dividends": obter_dividendos(ticker)
         }
     except Exception as e:
         print(f"Erro ao buscar detalhes de {ticker}: {e}")
@@ -174,7 +169,7 @@ def register_callbacks(app):
         
 
         ticker_symbol = info.get('symbol', ticker)
-        logo_url = get_logo_url(ticker_symbol)
+        logo_url = get_logo_src(ticker_symbol)
         
 
         if logo_url:
@@ -296,6 +291,7 @@ def register_callbacks(app):
         [State("input-ticker", "value")]
     )
     def atualizar_graficos(n_clicks, is_dark, periodo, ticker):
+        import plotly.express as px
         if not ticker:
             return None
         dados = buscar_detalhes_ativo(ticker)
@@ -368,8 +364,7 @@ def register_callbacks(app):
                     t_yf = t + '.SA'
                 else:
                     t_yf = t
-                acao = yf.Ticker(t_yf)
-                info = acao.info or {}
+                info = obter_info(t_yf)
                 dados.append({
                     "Ticker": t,
                     "Nome": info.get('longName', '-'),
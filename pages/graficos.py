@@ -1,6 +1,5 @@
 from dash import html, dcc
 import dash_bootstrap_components as dbc
-import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 from dash.dependencies import Input, Output
@@ -73,6 +72,7 @@ def register_callbacks(app):
         [Input('ativos-filtrados-store', 'data'), Input('switch-darkmode', 'value')]
     )
     def atualizar_heatmap(dados, is_dark):
+        import plotly.express as px
         if not dados:
             return go.Figure()
         df_ativos = pd.DataFrame(dados)
@@ -98,6 +98,7 @@ def register_callbacks(app):
         [Input('filtro-tipo', 'value'), Input('filtro-setor', 'value'), Input('ativos-filtrados-store', 'data'), Input('switch-darkmode', 'value')]
     )
     def atualizar_graficos_filtrados(tipo, setor, dados, is_dark):
+        import plotly.express as px
         if not dados:
             return html.Div("Sem dados para exibir.", className="text-muted p-4")
         df = pd.DataFrame(dados)
@@ -252,6 +253,7 @@ def register_callbacks(app):
         [Input("ativos-filtrados-store", "data"), Input("switch-darkmode", "value")]
     )
     def atualizar_graficos(dados, is_dark):
+        import plotly.express as px
         if not dados:
             return [{}] * 12
         df_ativos = pd.DataFrame(dados)
@@ -3,20 +3,77 @@
 import pandas as pd
 from dash import html
 import dash_bootstrap_components as dbc
-from pages.carteira import consultar_carteira, consultar_historico
+from pages.carteira import consultar_carteira, consultar_historico, consultar_movimentacoes, versao_carteira
+from pages.controle import resumo_mes_ano, versao_lancamentos
+from cache_compartilhado import memoizar
 
 from datetime import date
 
-def gerar_insights():
+INDICADORES = ['dy', 'pl', 'pvp', 'roe']
+
+
+# Retrato financeiro: os agregados que os insights, o painel do assistente e o prompt da IA usam.
+# As versões de carteira.db e financeiro.db (incrementadas por gatilhos) entram na chave do cache,
+# então as consultas só rodam de novo depois de alguma escrita
+def retrato_financeiro():
+    return retrato_do_dia(date.today().isoformat(), versao_carteira(), versao_lancamentos())
+
+
+@memoizar(grupos=["carteira"])
+def retrato_do_dia(hoje, versao_carteira, versao_lancamentos):
+    hoje = date.fromisoformat(hoje)
+    mes = str(hoje.month).zfill(2)
+    ano = str(hoje.year)
+
     df = pd.DataFrame(consultar_carteira())
+    retrato = {
+        "carteira_vazia": df.empty,
+        "total_investido": float(df['valor_total'].sum()) if not df.empty else 0,
+        "distribuicao": [],
+        "maior_ativo": None,
+        "medias": {},
+    }
+    if not df.empty:
+        retrato["distribuicao"] = [(tipo, float(prop)) for tipo, prop in df['tipo'].value_counts(normalize=True).items()]
+        top_ativo = df.nlargest(1, 'valor_total')
+        if not top_ativo.empty:
+            retrato["maior_ativo"] = {"ticker": top_ativo.iloc[0]['ticker'], "valor_total": float(top_ativo.iloc[0]['valor_total'])}
+        for indicador in INDICADORES:
+            media = df[indicador].mean()
+            if not pd.isna(media):
+                retrato["medias"][indicador] = float(media)
+
+    df_hist = consultar_historico('mensal')
+    retrato["tem_historico"] = not df_hist.empty
+    retrato["rentabilidade"] = 0
+    if not df_hist.empty:
+        df_hist = df_hist.sort_values("data")
+        inicial = df_hist.iloc[0]['valor_total']
+        final = df_hist.iloc[-1]['valor_total']
+        if inicial:
+            retrato["rentabilidade"] = float((final - inicial) / inicial * 100)
+
+    resumo_mes = resumo_mes_ano(mes, ano)
+    retrato["saldo"] = resumo_mes["saldo"]
+    retrato["total_receitas"] = resumo_mes["receitas"]
+    retrato["total_gastos"] = resumo_mes["gastos_outros"] + resumo_mes["gastos_cartao_pagos"]
+
+    df_mov = consultar_movimentacoes(mes, ano)
+    retrato["ultimas_movimentacoes"] = (
+        df_mov.sort_values('data', ascending=False).head(3).to_dict("records") if not df_mov.empty else []
+    )
+    return retrato
+
+
+def gerar_insights():
+    retrato = retrato_financeiro()
     insights = []
 
-    if df.empty:
+    if retrato["carteira_vazia"]:
         return ["Nenhum dado na carteira atual."]
 
  
-    tipo_distrib = df['tipo'].value_counts(normalize=True)
-    for tipo, proporcao in tipo_distrib.items():
+    for tipo, proporcao in retrato["distribuicao"]:
         if proporcao > 0.6:
             insights.append(f"🟥 Mais de {int(proporcao*100)}% da carteira está concentrada em {tipo}s. Avalie diversificação.")
         elif proporcao > 0.4:
@@ -25,25 +82,17 @@ def gerar_insights():
             insights.append(f"🟩 Diversificação saudável em {tipo}s.")
 
 
-    top_ativo = df.nlargest(1, 'valor_total')
-    if not top_ativo.empty:
-        ativo = top_ativo.iloc[0]
+    ativo = retrato["maior_ativo"]
+    if ativo:
         insights.append(f"🟨 O ativo com maior posição é {ativo['ticker']} com R$ {ativo['valor_total']:.2f}.")
 
 
-    for indicador in ['dy', 'pl', 'pvp', 'roe']:
-        media = df[indicador].mean()
-        if not pd.isna(media):
-            insights.append(f"📊 Média de {indicador.upper()}: {media:.2f}")
+    for indicador, media in retrato["medias"].items():
+        insights.append(f"📊 Média de {indicador.upper()}: {media:.2f}")
 
  
-    df_hist = consultar_historico('mensal')
-    if not df_hist.empty:
-        df_hist = df_hist.sort_values("data")
-        inicial = df_hist.iloc[0]['valor_total']
-        final = df_hist.iloc[-1]['valor_total']
-        variacao = final - inicial
-        pct = (variacao / inicial) * 100 if inicial else 0
+    if retrato["tem_historico"]:
+        pct = retrato["rentabilidade"]
         cor = "🟩" if pct >= 0 else "🟥"
         insights.append(f"{cor} A carteira variou {pct:.2f}% no último mês.")
 
@@ -1,18 +1,18 @@
-import sqlite3
 import pandas as pd
 from dash import dcc, html
 from dash.dependencies import Input, Output, State
 from dash import dash_table
 from datetime import date
 from dash import callback_context
-import plotly.express as px
 import dash_bootstrap_components as dbc
+from banco import conexao, consultar, executar, intervalo_mes
+from diferencas import diferenca_tabelas, aplicar_diferenca, edicao_da_tabela
+
+MARMITAS_DB_PATH = 'marmitas.db'
 
 def init_db():
 
-    conn = sqlite3.connect('marmitas.db')
-    cursor = conn.cursor()
-    cursor.execute('''
+    executar(MARMITAS_DB_PATH, '''
         CREATE TABLE IF NOT EXISTS marmitas (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             data TEXT NOT NULL,
@@ -20,43 +20,25 @@ def init_db():
             comprou INTEGER NOT NULL
         )
     ''')
-    conn.commit()
-    conn.close()
+    executar(MARMITAS_DB_PATH, 'CREATE INDEX IF NOT EXISTS idx_marmitas_data ON marmitas(data)')
 
 
 init_db()
 
 def adicionar_marmita(data, valor, comprou):
 
-    conn = sqlite3.connect('marmitas.db')
-    cursor = conn.cursor()
-    cursor.execute('INSERT INTO marmitas (data, valor, comprou) VALUES (?, ?, ?)', (data, valor, comprou))
-    conn.commit()
-    conn.close()
+    executar(MARMITAS_DB_PATH, 'INSERT INTO marmitas (data, valor, comprou) VALUES (?, ?, ?)', (data, valor, comprou))
 
 def consultar_marmitas(mes=None, ano=None):
 
-    conn = sqlite3.connect('marmitas.db')
-    cursor = conn.cursor()
-    
     if mes and ano:
-        query = 'SELECT * FROM marmitas WHERE strftime("%m", data) = ? AND strftime("%Y", data) = ?'
-        cursor.execute(query, (mes.zfill(2), str(ano)))
-        registros = cursor.fetchall()
+        query = 'SELECT * FROM marmitas WHERE data >= ? AND data < ?'
+        registros = consultar(MARMITAS_DB_PATH, query, intervalo_mes(mes, ano))
     else:
         registros = [] 
     
-    conn.close()
     return registros
 
-def remover_marmita(id_marmita):
-
-    conn = sqlite3.connect('marmitas.db')
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM marmitas WHERE id = ?', (id_marmita,))
-    conn.commit()
-    conn.close()
-
 PERIODOS = [
     {"label": "6 meses", "value": "6m"},
     {"label": "1 ano", "value": "1y"},
@@ -64,9 +46,7 @@ PERIODOS = [
 ]
 
 def gastos_mensais(periodo="6m"):
-    conn = sqlite3.connect('marmitas.db')
-    df = pd.read_sql_query('SELECT data, valor FROM marmitas WHERE comprou=1', conn, parse_dates=['data'])
-    conn.close()
+    df = pd.read_sql_query('SELECT data, valor FROM marmitas WHERE comprou=1', conexao(MARMITAS_DB_PATH), parse_dates=['data'])
     if df.empty:
         return pd.DataFrame(columns=["AnoMes", "valor"])
     df['AnoMes'] = df['data'].dt.to_period('M').astype(str)
@@ -156,15 +136,13 @@ def registrar_callbacks(app):
          State('tabela-marmitas', 'data')]
     )
     def gerenciar_marmitas(n_clicks, data_anterior, mes, ano, periodo_grafico, is_dark, data, valor, comprou, data_atual):
+        import plotly.express as px
         registros = []
         if n_clicks > 0 and data and comprou is not None:
             adicionar_marmita(data, valor if comprou == 1 else 0, comprou)
-        if data_anterior:
-            ids_anteriores = [row['id'] for row in data_anterior if 'id' in row]
-            ids_atuais = [row['id'] for row in data_atual if 'id' in row]
-            ids_deletados = list(set(ids_anteriores) - set(ids_atuais))
-            for id_deletado in ids_deletados:
-                remover_marmita(id_deletado)
+        if data_anterior and edicao_da_tabela('tabela-marmitas'):
+            # Só remoções são gravadas a partir da tabela
+            aplicar_diferenca(MARMITAS_DB_PATH, 'marmitas', diferenca_tabelas(data_anterior, data_atual))
         if mes and ano:
             registros = consultar_marmitas(mes, ano)
         else:
@@ -1,9 +1,8 @@
 from dash import html, dcc
 import dash_bootstrap_components as dbc
 import pandas as pd
-import plotly.express as px
 from dash.dependencies import Input, Output
-from complete_b3_logos_mapping import get_logo_url
+from complete_b3_logos_mapping import get_logo_src
 import re
 
 def extract_ticker_clean(ticker_value):
@@ -101,6 +100,7 @@ def register_callbacks(app):
         [Input("ativos-filtrados-store", "data"), Input('rankers-filtro-tipo', 'value'), Input('switch-darkmode', 'value')]
     )
     def atualizar_rankers(dados, tipo, is_dark):
+        import plotly.express as px
         if not dados:
             alert = dbc.Alert("Carregando dados...", color="warning")
             fig = px.bar(title="Carregando...")
@@ -134,7 +134,7 @@ def register_callbacks(app):
             
             # Obter logo do ticker
             ticker = item['ticker_clean']
-            logo_url = get_logo_url(ticker)
+            logo_url = get_logo_src(ticker)
             
             if logo_url:
                 logo_element = html.Img(
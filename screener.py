@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+
+OPERADORES = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    "==": np.equal,
+}
+
+
+class Screener:
+
+    def __init__(self, dados):
+        if isinstance(dados, pd.DataFrame):
+            self.df = dados.reset_index(drop=True)
+            self.registros = None
+        else:
+            self.registros = list(dados)
+            self.df = pd.DataFrame(self.registros)
+        self.colunas = {}
+
+    def __len__(self):
+        return len(self.df)
+
+    def coluna(self, nome):
+        if nome not in self.colunas:
+            if nome in self.df.columns:
+                valores = pd.to_numeric(self.df[nome], errors="coerce").to_numpy(dtype="float64")
+            else:
+                valores = np.full(len(self.df), np.nan)
+            self.colunas[nome] = valores
+        return self.colunas[nome]
+
+    def mascara(self, predicados):
+        mascara = np.ones(len(self.df), dtype=bool)
+        for coluna, operador, valor in predicados:
+            with np.errstate(invalid="ignore"):
+                mascara &= OPERADORES[operador](self.coluna(coluna), valor)
+        return mascara
+
+    def top_n(self, indices, ordenar_por, n):
+        # Maiores valores primeiro, preservando a ordem original em empates (como sorted estável)
+        valores = self.coluna(ordenar_por)[indices]
+        if n is not None and len(indices) > n:
+            limiar = valores[np.argpartition(valores, len(valores) - n)[len(valores) - n]]
+            acima = np.flatnonzero(valores > limiar)
+            empates = np.flatnonzero(valores == limiar)[: n - len(acima)]
+            selecionados = np.sort(np.concatenate([acima, empates]))
+            indices, valores = indices[selecionados], valores[selecionados]
+        return indices[np.argsort(-valores, kind="stable")]
+
+    def filtrar(self, predicados, ordenar_por="dividend_yield", n=10):
+        indices = np.flatnonzero(self.mascara(predicados))
+        if ordenar_por:
+            indices = self.top_n(indices, ordenar_por, n)
+        elif n is not None:
+            indices = indices[:n]
+        if self.registros is not None:
+            return [self.registros[i] for i in indices]
+        return self.df.iloc[indices].to_dict("records")
+
+
+def filtrar_ativos(dados, predicados, ordenar_por="dividend_yield", n=10):
+    return Screener(dados).filtrar(predicados, ordenar_por, n)
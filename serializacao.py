@@ -0,0 +1,145 @@
+import gzip
+import io
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Dependências opcionais: sem elas o formato/codificação correspondente só não é oferecido
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+MIME_ARROW = "application/vnd.apache.arrow.stream"
+TAMANHO_MINIMO_COMPRESSAO = 1024
+
+
+def formatos_disponiveis():
+    formatos = ["registros", "colunas"]
+    if pa is not None:
+        formatos.append("arrow")
+    return formatos
+
+
+def codificacoes_disponiveis():
+    codificacoes = ["gzip"]
+    if brotli is not None:
+        codificacoes.insert(0, "br")
+    return codificacoes
+
+
+def valores_json(serie):
+    # inf/-inf/NaN não existem em JSON: viram null
+    if pd.api.types.is_bool_dtype(serie) or pd.api.types.is_integer_dtype(serie):
+        return [None if pd.isna(v) else v for v in serie.tolist()]
+    if pd.api.types.is_numeric_dtype(serie):
+        valores = serie.to_numpy(dtype="float64", na_value=np.nan)
+        validos = np.isfinite(valores)
+        return [float(v) if ok else None for v, ok in zip(valores.tolist(), validos.tolist())]
+    return [None if pd.isna(v) else v for v in serie.tolist()]
+
+
+def serializar_registros(df):
+    if df is None:
+        return b"[]"
+    return json.dumps(df.to_dict("records"), ensure_ascii=False).encode("utf-8")
+
+
+def serializar_colunas(df):
+    if df is None:
+        return b'{"colunas": [], "linhas": 0, "dados": {}}'
+    dados = {coluna: valores_json(df[coluna]) for coluna in df.columns}
+    payload = {"colunas": list(map(str, df.columns)), "linhas": len(df), "dados": dados}
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False).encode("utf-8")
+
+
+def serializar_arrow(df):
+    tabela = pa.Table.from_pandas(df if df is not None else pd.DataFrame(), preserve_index=False)
+    buffer = io.BytesIO()
+    with pa.ipc.new_stream(buffer, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+    return buffer.getvalue()
+
+
+SERIALIZADORES = {
+    "registros": ("application/json", serializar_registros),
+    "colunas": ("application/json", serializar_colunas),
+    "arrow": (MIME_ARROW, serializar_arrow),
+}
+
+
+def comprimir(corpo, codificacao):
+    if codificacao == "br":
+        return brotli.compress(corpo, quality=5)
+    if codificacao == "gzip":
+        return gzip.compress(corpo, compresslevel=6)
+    return corpo
+
+
+def escolher_formato(formato_pedido, accept):
+    if formato_pedido:
+        return formato_pedido if formato_pedido in formatos_disponiveis() else None
+    if pa is not None and MIME_ARROW in (accept or ""):
+        return "arrow"
+    return "registros"
+
+
+def escolher_codificacao(accept_encoding):
+    aceitas = {}
+    for parte in (accept_encoding or "").split(","):
+        nome, _, parametros = parte.strip().partition(";")
+        qualidade = 1.0
+        if parametros.strip().startswith("q="):
+            try:
+                qualidade = float(parametros.strip()[2:])
+            except ValueError:
+                qualidade = 0.0
+        if nome:
+            aceitas[nome.strip().lower()] = qualidade
+    for codificacao in codificacoes_disponiveis():
+        if aceitas.get(codificacao, aceitas.get("*", 0)) > 0:
+            return codificacao
+    return None
+
+
+def etag_corresponde(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidatos = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidatos or any(c.removeprefix("W/") == etag for c in candidatos)
+
+
+class CacheSerializacao:
+    # Guarda os corpos já codificados da versão atual do snapshot
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.versao = None
+        self.corpos = {}
+
+    def obter(self, versao, formato, codificacao, df):
+        chave = (formato, codificacao)
+        with self.lock:
+            if self.versao != versao:
+                self.versao, self.corpos = versao, {}
+            if chave in self.corpos:
+                return self.corpos[chave]
+
+        mime, serializar = SERIALIZADORES[formato]
+        corpo = serializar(df)
+        if codificacao and len(corpo) < TAMANHO_MINIMO_COMPRESSAO:
+            codificacao = None
+        resultado = (mime, comprimir(corpo, codificacao), codificacao)
+
+        with self.lock:
+            if self.versao == versao:
+                self.corpos[chave] = resultado
+        return resultado
@@ -0,0 +1,407 @@
+import hashlib
+import itertools
+import os
+import queue
+import secrets
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+from cache_respostas import CacheRespostas
+
+
+# Serviço de inferência do assistente: um processo carrega o modelo uma única vez e atende todos os
+# workers web por um socket local (multiprocessing.connection). As perguntas entram em uma fila e
+# são geradas uma por vez, token a token: o texto parcial pode ser consultado durante a geração e
+# o trabalho pode ser cancelado. O prefixo fixo do prompt (instruções + contexto financeiro) não é
+# reavaliado quando só a pergunta muda, porque o llama_cpp reaproveita os tokens iniciais em comum com
+# a chamada anterior; perguntas repetidas com o mesmo contexto saem de cache_respostas sem passar pelo
+# modelo. Uso: python servico_ia.py
+CAMINHO_MODELO = os.environ.get("FINMA_IA_MODELO", "modelos/mistral-7b-instruct-v0.1.Q4_K_M.gguf")
+ENDERECO_SERVICO = (os.environ.get("FINMA_IA_HOST", "127.0.0.1"), int(os.environ.get("FINMA_IA_PORTA", 8765)))
+# Sem FINMA_IA_CHAVE, a chave é gerada no primeiro uso e guardada neste arquivo (ao lado dos bancos)
+CAMINHO_CHAVE = os.environ.get("FINMA_IA_ARQUIVO_CHAVE", "servico_ia.chave")
+THREADS_MODELO = int(os.environ.get("FINMA_IA_THREADS", 0)) or None
+CONTEXTO_MODELO = int(os.environ.get("FINMA_IA_CONTEXTO", 2048))
+TAMANHO_FILA = int(os.environ.get("FINMA_IA_FILA", 16))
+AUTOINICIAR_SERVICO = os.environ.get("FINMA_IA_AUTOINICIAR", "1") == "1"
+MAX_TRABALHOS_GUARDADOS = 100
+ESPERA_INICIO_SERVICO = 10
+
+
+def carregar_modelo():
+    # llama_cpp só é importado no processo do serviço
+    from llama_cpp import Llama
+    return Llama(model_path=CAMINHO_MODELO, n_ctx=CONTEXTO_MODELO, n_threads=THREADS_MODELO, verbose=False)
+
+
+class Trabalho:
+    def __init__(self, id_trabalho, prompt, max_tokens, prefixo="", pergunta=""):
+        self.id = id_trabalho
+        self.prompt = prompt
+        # Início fixo do prompt cujo estado avaliado pode ser reaproveitado entre perguntas
+        self.prefixo = prefixo if prefixo and prompt.startswith(prefixo) else ""
+        # Versão do contexto financeiro: o prefixo muda junto com ele
+        self.versao_contexto = hashlib.sha1(self.prefixo.encode("utf-8")).hexdigest()
+        self.pergunta = pergunta
+        self.do_cache = False
+        self.max_tokens = max_tokens
+        self.estado = "na_fila"
+        self.texto = ""
+        self.erro = None
+        self.tokens = 0
+        self.cancelado = False
+        self.criado_em = time.time()
+        self.iniciado_em = None
+        self.primeiro_token_em = None
+        self.finalizado_em = None
+        self.concluido = threading.Event()
+
+    def primeiro_token_segundos(self):
+        if self.primeiro_token_em is None:
+            return None
+        return round(self.primeiro_token_em - self.iniciado_em, 2)
+
+    def resumo(self):
+        duracao = (self.finalizado_em or time.time()) - self.iniciado_em if self.iniciado_em else 0
+        return {
+            "id": self.id,
+            "estado": self.estado,
+            "texto": self.texto,
+            "erro": self.erro,
+            "tokens": self.tokens,
+            "espera_segundos": round((self.iniciado_em or time.time()) - self.criado_em, 2),
+            "primeiro_token_segundos": self.primeiro_token_segundos(),
+            "geracao_segundos": round(duracao, 2),
+            "tokens_por_segundo": round(self.tokens / duracao, 2) if duracao and self.tokens else None,
+            "do_cache": self.do_cache,
+        }
+
+
+class ServicoIA:
+
+    def __init__(self, carregar=carregar_modelo, tamanho_fila=TAMANHO_FILA, respostas=None):
+        self.carregar = carregar
+        self.respostas = respostas if respostas is not None else CacheRespostas()
+        self.modelo = None
+        self.fila = queue.Queue(maxsize=tamanho_fila)
+        self.lock = threading.Lock()
+        self.trabalhos = {}
+        self.ids = itertools.count(1)
+        self.metricas = {
+            "modelo": "carregando",
+            "respostas": 0,
+            "erros": 0,
+            "recusadas_fila_cheia": 0,
+            "tokens_gerados": 0,
+            "segundos_gerando": 0.0,
+            "ultimo_tokens_por_segundo": None,
+            "ultimo_primeiro_token_segundos": None,
+            "canceladas": 0,
+            "respostas_do_cache": 0,
+            "prefixos_reaproveitados": 0,
+            "prefixos_avaliados": 0,
+            "tokens_reaproveitados": 0,
+            "ultimo_tokens_reaproveitados": None,
+        }
+
+    # Geração: uma thread, um trabalho por vez (o modelo não é thread-safe)
+    def gerar_em_ordem(self):
+        try:
+            self.modelo = self.carregar()
+            self.metricas["modelo"] = "pronto"
+        except Exception as e:
+            print(f" Erro ao carregar o modelo: {e}")
+            self.metricas["modelo"] = f"erro: {e}"
+        while True:
+            trabalho = self.fila.get()
+            self.executar(trabalho)
+
+    def executar(self, trabalho):
+        trabalho.iniciado_em = time.time()
+        if trabalho.cancelado:
+            # Cancelado ainda na fila: nem chega ao modelo
+            trabalho.estado = "cancelado"
+            trabalho.finalizado_em = trabalho.iniciado_em
+            self.registrar_metricas(trabalho)
+            trabalho.concluido.set()
+            return
+        trabalho.estado = "gerando"
+        try:
+            if self.modelo is None:
+                raise RuntimeError(f"Modelo indisponível ({self.metricas['modelo']})")
+            self.medir_reaproveitamento(trabalho)
+            # Com stream=True o llama_cpp devolve um pedaço por token gerado
+            for parte in self.modelo(trabalho.prompt, max_tokens=trabalho.max_tokens, stream=True):
+                if trabalho.cancelado:
+                    break
+                if trabalho.primeiro_token_em is None:
+                    trabalho.primeiro_token_em = time.time()
+                trabalho.texto += parte["choices"][0]["text"]
+                trabalho.tokens += 1
+            trabalho.texto = trabalho.texto.strip()
+            trabalho.estado = "cancelado" if trabalho.cancelado else "concluido"
+            if trabalho.estado == "concluido" and trabalho.pergunta:
+                self.respostas.guardar(trabalho.versao_contexto, trabalho.pergunta, trabalho.texto)
+        except Exception as e:
+            trabalho.erro = str(e)
+            trabalho.estado = "erro"
+        trabalho.finalizado_em = time.time()
+        self.registrar_metricas(trabalho)
+        trabalho.concluido.set()
+
+    def medir_reaproveitamento(self, trabalho):
+        # A cada chamada o llama_cpp compara os tokens do prompt com os já avaliados (_input_ids, da
+        # chamada anterior) e só processa o que vem depois do maior início em comum. Aqui só medimos se o
+        # prefixo foi aproveitado, tokenizando como a completion faz (special=True)
+        if not trabalho.prefixo or not hasattr(self.modelo, "_input_ids"):
+            return
+        try:
+            tokens = self.modelo.tokenize(trabalho.prompt.encode("utf-8"), special=True)
+            tokens_prefixo = self.modelo.tokenize(trabalho.prefixo.encode("utf-8"), special=True)
+            # O último token do prompt é sempre reavaliado pelo llama_cpp
+            comuns = tokens_em_comum(self.modelo._input_ids, tokens[:-1])
+            # Na emenda com a pergunta a tokenização do prefixo pode mudar; conta só o que sobra dele no prompt
+            no_prompt = tokens_em_comum(tokens_prefixo, tokens)
+        except Exception as e:
+            print(f" Reaproveitamento do prefixo não medido: {e}")
+            return
+        with self.lock:
+            self.metricas["prefixos_reaproveitados" if comuns >= no_prompt else "prefixos_avaliados"] += 1
+            self.metricas["tokens_reaproveitados"] += comuns
+            self.metricas["ultimo_tokens_reaproveitados"] = comuns
+
+    def registrar_metricas(self, trabalho):
+        with self.lock:
+            if trabalho.estado == "erro":
+                self.metricas["erros"] += 1
+                return
+            if trabalho.estado == "cancelado":
+                self.metricas["canceladas"] += 1
+            else:
+                self.metricas["respostas"] += 1
+            duracao = trabalho.finalizado_em - trabalho.iniciado_em
+            self.metricas["tokens_gerados"] += trabalho.tokens
+            self.metricas["segundos_gerando"] += duracao
+            if duracao > 0 and trabalho.tokens:
+                self.metricas["ultimo_tokens_por_segundo"] = round(trabalho.tokens / duracao, 2)
+            if trabalho.primeiro_token_em is not None:
+                self.metricas["ultimo_primeiro_token_segundos"] = trabalho.primeiro_token_segundos()
+
+    def enviar(self, prompt, max_tokens, prefixo="", pergunta=""):
+        trabalho = Trabalho(next(self.ids), prompt, max_tokens, prefixo, pergunta)
+        resposta = self.respostas.obter(trabalho.versao_contexto, pergunta) if pergunta else None
+        if resposta is not None:
+            # Mesma pergunta (ou quase) com o mesmo contexto: responde sem passar pela fila nem pelo modelo
+            trabalho.texto = resposta
+            trabalho.do_cache = True
+            trabalho.estado = "concluido"
+            trabalho.iniciado_em = trabalho.finalizado_em = time.time()
+            trabalho.concluido.set()
+            with self.lock:
+                self.metricas["respostas_do_cache"] += 1
+            self.guardar_trabalho(trabalho)
+            return {"id": trabalho.id, "posicao": 0}
+        try:
+            self.fila.put_nowait(trabalho)
+        except queue.Full:
+            with self.lock:
+                self.metricas["recusadas_fila_cheia"] += 1
+            return {"erro": "Fila do assistente cheia, tente novamente em instantes"}
+        self.guardar_trabalho(trabalho)
+        return {"id": trabalho.id, "posicao": self.fila.qsize()}
+
+    def guardar_trabalho(self, trabalho):
+        with self.lock:
+            self.trabalhos[trabalho.id] = trabalho
+            # Guarda só os trabalhos mais recentes para consulta
+            for antigo in list(self.trabalhos)[:-MAX_TRABALHOS_GUARDADOS]:
+                if self.trabalhos[antigo].concluido.is_set():
+                    del self.trabalhos[antigo]
+
+    def aguardar(self, id_trabalho, timeout=0):
+        trabalho = self.trabalhos.get(id_trabalho)
+        if trabalho is None:
+            return {"erro": f"Trabalho {id_trabalho} não encontrado"}
+        if timeout:
+            trabalho.concluido.wait(timeout)
+        resumo = trabalho.resumo()
+        if trabalho.estado == "na_fila":
+            resumo["posicao"] = sum(1 for t in list(self.trabalhos.values()) if t.estado == "na_fila" and t.id <= trabalho.id)
+        return resumo
+
+    def cancelar(self, id_trabalho):
+        trabalho = self.trabalhos.get(id_trabalho)
+        if trabalho is None:
+            return {"erro": f"Trabalho {id_trabalho} não encontrado"}
+        if not trabalho.concluido.is_set():
+            trabalho.cancelado = True
+        return {"id": id_trabalho, "cancelado": trabalho.cancelado}
+
+    def resumo_metricas(self):
+        with self.lock:
+            metricas = dict(self.metricas)
+        segundos = metricas["segundos_gerando"]
+        metricas["tokens_por_segundo_medio"] = round(metricas["tokens_gerados"] / segundos, 2) if segundos else None
+        metricas["segundos_gerando"] = round(segundos, 2)
+        metricas["na_fila"] = self.fila.qsize()
+        metricas["threads"] = THREADS_MODELO or os.cpu_count()
+        metricas["cache_respostas"] = self.respostas.estatisticas()
+        return metricas
+
+    def atender(self, pedido):
+        tipo = pedido.get("tipo")
+        if tipo == "enviar":
+            return self.enviar(pedido["prompt"], pedido.get("max_tokens", 256), pedido.get("prefixo", ""), pedido.get("pergunta", ""))
+        if tipo == "consultar":
+            return self.aguardar(pedido["id"])
+        if tipo == "cancelar":
+            return self.cancelar(pedido["id"])
+        if tipo == "metricas":
+            return self.resumo_metricas()
+        return {"erro": f"Pedido desconhecido: {tipo}"}
+
+    def atender_conexao(self, conexao):
+        with conexao:
+            while True:
+                try:
+                    pedido = conexao.recv()
+                except (EOFError, OSError):
+                    return
+                conexao.send(self.atender(pedido))
+
+    def servir(self, endereco=ENDERECO_SERVICO, chave=None):
+        # Abre a porta antes de carregar o modelo: um segundo processo iniciado em paralelo falha aqui e sai
+        with Listener(endereco, authkey=chave or chave_servico()) as ouvinte:
+            print(f"🤖 Serviço de IA escutando em {endereco[0]}:{endereco[1]}")
+            threading.Thread(target=self.gerar_em_ordem, name="ia-geracao", daemon=True).start()
+            while True:
+                try:
+                    conexao = ouvinte.accept()
+                except Exception as e:
+                    print(f" Conexão recusada pelo serviço de IA: {e}")
+                    continue
+                threading.Thread(target=self.atender_conexao, args=(conexao,), name="ia-conexao", daemon=True).start()
+
+
+def tokens_em_comum(a, b):
+    comuns = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        comuns += 1
+    return comuns
+
+
+_chave = None
+
+
+def chave_servico():
+    # O Listener desserializa (pickle) tudo que recebe: quem conhece a chave executa código no serviço.
+    # Por isso não há chave padrão fixa; a gerada fica em um arquivo legível só pelo dono (0600),
+    # compartilhado pelo serviço e pelos workers, que rodam no mesmo diretório
+    global _chave
+    if _chave is None:
+        chave = os.environ.get("FINMA_IA_CHAVE")
+        _chave = chave.encode("utf-8") if chave else ler_ou_criar_chave(CAMINHO_CHAVE)
+    return _chave
+
+
+def ler_ou_criar_chave(caminho):
+    if not os.path.exists(caminho):
+        # Escreve em um temporário (mkstemp já cria com 0600) e publica com link: se dois processos
+        # criarem ao mesmo tempo, só um link vence e ninguém lê um arquivo pela metade
+        descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(caminho)))
+        try:
+            with os.fdopen(descritor, "w") as arquivo:
+                arquivo.write(secrets.token_hex(32))
+            os.link(temporario, caminho)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(temporario)
+    if os.stat(caminho).st_mode & 0o077:
+        raise PermissionError(f"{caminho} pode ser lido por outros usuários; use chmod 600")
+    with open(caminho) as arquivo:
+        return arquivo.read().strip().encode("utf-8")
+
+
+# Lado do cliente (workers web)
+def pedir(pedido, endereco=ENDERECO_SERVICO, chave=None):
+    with Client(endereco, authkey=chave or chave_servico()) as conexao:
+        conexao.send(pedido)
+        return conexao.recv()
+
+
+def iniciar_servico():
+    print("🤖 Iniciando o serviço de IA em segundo plano...")
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__)],
+        stdin=subprocess.DEVNULL, start_new_session=True,
+    )
+
+
+def pedir_ao_servico(pedido):
+    # Se não houver serviço rodando, inicia um (se vários workers tentarem, só um consegue abrir a porta)
+    try:
+        return pedir(pedido)
+    except ConnectionRefusedError:
+        if not AUTOINICIAR_SERVICO:
+            raise
+    iniciar_servico()
+    limite = time.time() + ESPERA_INICIO_SERVICO
+    while True:
+        time.sleep(0.2)
+        try:
+            return pedir(pedido)
+        except ConnectionRefusedError:
+            if time.time() > limite:
+                raise
+
+
+def enviar_pergunta(prompt, max_tokens=256, prefixo="", pergunta=""):
+    # Com a pergunta isolada o serviço pode responder do cache de respostas
+    enviado = pedir_ao_servico({
+        "tipo": "enviar", "prompt": prompt, "max_tokens": max_tokens, "prefixo": prefixo, "pergunta": pergunta,
+    })
+    if "erro" in enviado:
+        raise RuntimeError(enviado["erro"])
+    return enviado["id"]
+
+
+def consultar_resposta(id_trabalho):
+    # Estado atual do trabalho, com o texto gerado até agora
+    return pedir({"tipo": "consultar", "id": id_trabalho})
+
+
+def cancelar_resposta(id_trabalho):
+    try:
+        return pedir({"tipo": "cancelar", "id": id_trabalho})
+    except OSError:
+        return None
+
+
+def metricas_servico():
+    try:
+        return {"disponivel": True, **pedir({"tipo": "metricas"})}
+    except (ConnectionRefusedError, OSError):
+        return {"disponivel": False}
+
+
+def registrar_rota_ia(server):
+    @server.route("/ia_status", methods=["GET"])
+    def status_ia():
+        return metricas_servico()
+
+    return status_ia
+
+
+if __name__ == "__main__":
+    try:
+        ServicoIA().servir()
+    except OSError as e:
+        # Outro processo já abriu a porta: o serviço já está rodando
+        print(f" Serviço de IA não iniciado em {ENDERECO_SERVICO[0]}:{ENDERECO_SERVICO[1]}: {e}")
@@ -0,0 +1,104 @@
+import threading
+import time
+
+
+MAX_ERROS_REGISTRADOS = 50
+
+
+class Tarefa:
+    # Executa uma função em segundo plano, uma execução por vez (single-flight)
+
+    def __init__(self, nome, funcao):
+        self.nome = nome
+        self.funcao = funcao
+        self.lock = threading.Lock()
+        self.thread = None
+        self.estado = {
+            "nome": nome,
+            "status": "ocioso",
+            "concluidos": 0,
+            "total": 0,
+            "total_erros": 0,
+            "erros": [],
+            "iniciado_em": None,
+            "finalizado_em": None,
+        }
+
+    def em_andamento(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def iniciar(self, *args, **kwargs):
+        with self.lock:
+            if self.em_andamento():
+                return False
+            self.estado.update({
+                "status": "executando",
+                "concluidos": 0,
+                "total": 0,
+                "total_erros": 0,
+                "erros": [],
+                "iniciado_em": time.time(),
+                "finalizado_em": None,
+            })
+            self.thread = threading.Thread(
+                target=self._executar, args=args, kwargs=kwargs,
+                name=f"tarefa-{self.nome}", daemon=True
+            )
+            self.thread.start()
+            return True
+
+    def aguardar(self, timeout=None):
+        thread = self.thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _executar(self, *args, **kwargs):
+        status = "concluido"
+        try:
+            self.funcao(self, *args, **kwargs)
+        except Exception as e:
+            print(f" Erro na tarefa {self.nome}: {e}")
+            self.registrar_erro(str(e))
+            status = "erro"
+        with self.lock:
+            self.estado["status"] = status
+            self.estado["finalizado_em"] = time.time()
+
+    def definir_total(self, total):
+        with self.lock:
+            self.estado["total"] = total
+
+    def registrar_erro(self, erro):
+        with self.lock:
+            self.estado["total_erros"] += 1
+            self.estado["erros"] = (self.estado["erros"] + [erro])[-MAX_ERROS_REGISTRADOS:]
+
+    def avancar(self, quantidade=1, erro=None):
+        with self.lock:
+            self.estado["concluidos"] += quantidade
+        if erro:
+            self.registrar_erro(erro)
+
+    def status(self):
+        with self.lock:
+            estado = dict(self.estado, erros=list(self.estado["erros"]))
+        inicio, fim = estado["iniciado_em"], estado["finalizado_em"]
+        decorrido = ((fim or time.time()) - inicio) if inicio else 0
+        restantes = estado["total"] - estado["concluidos"]
+        eta = None
+        if estado["status"] == "executando" and estado["concluidos"] and restantes > 0:
+            eta = round(decorrido / estado["concluidos"] * restantes, 1)
+        estado["decorrido_segundos"] = round(decorrido, 1)
+        estado["eta_segundos"] = eta
+        return estado
+
+
+def agendar_periodicamente(tarefa, intervalo_segundos, *args, **kwargs):
+    def laco():
+        while True:
+            tarefa.iniciar(*args, **kwargs)
+            time.sleep(intervalo_segundos)
+
+    thread = threading.Thread(target=laco, name=f"agenda-{tarefa.nome}", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,56 @@
+import importlib
+
+import pytest
+
+
+@pytest.fixture
+def carteira(tmp_path, monkeypatch):
+    # carteira.db é relativo ao diretório atual: cada teste usa um banco novo
+    monkeypatch.chdir(tmp_path)
+    modulo = importlib.import_module("pages.carteira")
+    modulo.init_db()
+    return modulo
+
+
+@pytest.fixture
+def models(tmp_path, monkeypatch):
+    # fundamentos.db também é relativo ao diretório atual
+    monkeypatch.chdir(tmp_path)
+    modulo = importlib.import_module("models")
+    modulo.criar_tabela_fundamentos()
+    return modulo
+
+
+class AppFalso:
+    # Guarda as funções registradas com @app.callback para chamá-las diretamente nos testes
+    def __init__(self):
+        self.callbacks = {}
+
+    def callback(self, *args, **kwargs):
+        def registrar(funcao):
+            self.callbacks[funcao.__name__] = funcao
+            return funcao
+        return registrar
+
+
+@pytest.fixture
+def callbacks_da_pagina(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    def carregar(nome):
+        modulo = importlib.import_module(nome)
+        modulo.init_db()
+        app = AppFalso()
+        modulo.registrar_callbacks(app)
+        return modulo, app.callbacks
+    return carregar
+
+
+@pytest.fixture
+def disparo(monkeypatch):
+    # Simula callback_context.triggered_prop_ids: disparo("filtro-mes.value")
+    import diferencas
+
+    def disparar(*propriedades):
+        monkeypatch.setattr(diferencas, "propriedades_disparadas", lambda: {p: p.split(".")[0] for p in propriedades})
+    return disparar
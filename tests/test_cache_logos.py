@@ -0,0 +1,107 @@
+import importlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from flask import Flask
+
+PNG = b"\x89PNG\r\n\x1a\nlogo"
+OUTRO_PNG = b"\x89PNG\r\n\x1a\noutro"
+
+# caminho -> (status, content-type, corpo, espera em segundos)
+RESPOSTAS = {
+    "/ok.png": (200, "image/png", PNG, 0),
+    "/outro.png": (200, "image/png", OUTRO_PNG, 0),
+    "/404.png": (404, "text/html", b"nao encontrado", 0),
+    "/410.png": (410, "text/html", b"removido", 0),
+    "/pagina.html": (200, "text/html", b"<html></html>", 0),
+    "/500.png": (500, "text/plain", b"erro", 0),
+    "/503.png": (503, "text/plain", b"indisponivel", 0),
+    "/lento.png": (200, "image/png", PNG, 2),
+}
+
+
+class Servidor(BaseHTTPRequestHandler):
+    def do_GET(self):
+        status, content_type, corpo, espera = RESPOSTAS[self.path]
+        time.sleep(espera)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def servidor():
+    # Substituto local do servidor de logos
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Servidor)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+@pytest.fixture
+def logos(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    modulo = importlib.import_module("cache_logos")
+    modulo.criar_tabela_logos()
+    monkeypatch.setattr(modulo, "TIMEOUT_DOWNLOAD_LOGO", 0.5)
+    return modulo
+
+
+@pytest.mark.parametrize("caminho", ["/404.png", "/410.png", "/pagina.html"])
+def test_ausencia_real_fica_em_cache(logos, servidor, caminho):
+    assert logos.atualizar_logo("PETR4", servidor + caminho) is False
+
+    encontrado, _, imagem, _, _ = logos.carregar_logo("PETR4")
+    assert (encontrado, imagem) == (0, None)
+
+
+@pytest.mark.parametrize("caminho", ["/500.png", "/503.png", "/lento.png"])
+def test_falha_temporaria_nao_mexe_no_logo_salvo(logos, servidor, caminho):
+    assert logos.atualizar_logo("PETR4", servidor + "/ok.png") is True
+
+    with pytest.raises(requests.RequestException):
+        logos.baixar_logo("PETR4", servidor + caminho)
+    assert logos.atualizar_logo("PETR4", servidor + caminho) is None
+
+    encontrado, content_type, imagem, _, _ = logos.carregar_logo("PETR4")
+    assert (encontrado, content_type, imagem) == (1, "image/png", PNG)
+
+
+def test_falha_temporaria_nao_marca_ticker_novo_como_ausente(logos, servidor):
+    assert logos.atualizar_logo("VALE3", servidor + "/503.png") is None
+    assert logos.carregar_logo("VALE3") is None
+
+
+def test_download_com_sucesso_salva_a_imagem(logos, servidor):
+    assert logos.atualizar_logo("PETR4", servidor + "/ok.png") is True
+    assert logos.atualizar_logo("PETR4", servidor + "/outro.png") is True
+
+    encontrado, content_type, imagem, hash_imagem, _ = logos.carregar_logo("PETR4")
+    assert (encontrado, content_type, imagem) == (1, "image/png", OUTRO_PNG)
+    assert hash_imagem
+
+
+def test_rota_responde_304_com_etag_igual(logos, servidor):
+    logos.atualizar_logo("PETR4", servidor + "/ok.png")
+    app = Flask(__name__)
+    logos.registrar_rota_logos(app)
+    cliente = app.test_client()
+
+    resposta = cliente.get("/logos/PETR4")
+    assert resposta.status_code == 200
+    assert resposta.data == PNG
+    etag = resposta.headers["ETag"]
+
+    revalidacao = cliente.get("/logos/PETR4", headers={"If-None-Match": etag})
+    assert revalidacao.status_code == 304
+    assert revalidacao.headers["ETag"] == etag
+    assert cliente.get("/logos/PETR4", headers={"If-None-Match": '"outro"'}).status_code == 200
@@ -0,0 +1,51 @@
+import pytest
+
+from cache_respostas import CacheRespostas
+
+VERSAO = "contexto"
+
+
+def cache_com(similaridade, perguntas):
+    cache = CacheRespostas(caminho="", similaridade_minima=similaridade)
+    for pergunta in perguntas:
+        cache.guardar(VERSAO, pergunta, f"resposta para: {pergunta}")
+    return cache
+
+
+def test_padrao_so_reaproveita_a_mesma_pergunta_normalizada():
+    cache = CacheRespostas(caminho="")
+    cache.guardar(VERSAO, "O que é o Ibovespa?", "índice")
+
+    assert cache.obter(VERSAO, "o que e o IBOVESPA") == "índice"
+    assert cache.obter(VERSAO, "O que é Ibovespa?") is None
+    assert cache.obter("outro contexto", "O que é o Ibovespa?") is None
+
+
+@pytest.mark.parametrize("guardada, nova", [
+    ("Qual foi o meu saldo no mês de março?", "Qual foi o meu saldo no mês de maio?"),
+    ("Minha carteira está bem diversificada?", "Minha carteira não está bem diversificada?"),
+    ("Quanto a Maria gastou no cartão este mês?", "Quanto a Mariana gastou no cartão este mês?"),
+    ("Qual o P/L da PETR4?", "Qual o P/L da PETR3?"),
+])
+@pytest.mark.parametrize("similaridade", [1, 0.8])
+def test_perguntas_com_sentido_diferente_nao_reaproveitam_resposta(guardada, nova, similaridade):
+    cache = cache_com(similaridade, [guardada])
+
+    assert cache.obter(VERSAO, nova) is None
+
+
+def test_parecidas_com_os_mesmos_termos_reaproveitam_quando_ativado():
+    cache = cache_com(0.8, ["O que é o Ibovespa?"])
+
+    assert cache.obter(VERSAO, "O que é Ibovespa") == "resposta para: O que é o Ibovespa?"
+    assert cache.estatisticas()["acertos_similares"] == 1
+
+
+def test_termos_sobrevivem_ao_reinicio(tmp_path):
+    caminho = str(tmp_path / "respostas.db")
+    CacheRespostas(caminho=caminho, similaridade_minima=0.8).guardar(VERSAO, "Quanto a Maria gastou no cartão?", "R$ 10")
+
+    recarregado = CacheRespostas(caminho=caminho, similaridade_minima=0.8)
+
+    assert recarregado.obter(VERSAO, "Quanto a Mariana gastou no cartão?") is None
+    assert recarregado.obter(VERSAO, "quanto a maria gastou no cartao") == "R$ 10"
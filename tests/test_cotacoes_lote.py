@@ -0,0 +1,43 @@
+import sys
+import threading
+import time
+import types
+
+import pandas as pd
+
+
+def yfinance_falso(monkeypatch):
+    # Imita o yfinance 0.2.28: cada download zera um dicionário global e espera ele encher de novo
+    chamadas = {"em_andamento": 0, "maximo": 0, "lotes": []}
+    lock = threading.Lock()
+    compartilhado = {}
+
+    def download(tickers, **parametros):
+        with lock:
+            chamadas["em_andamento"] += 1
+            chamadas["maximo"] = max(chamadas["maximo"], chamadas["em_andamento"])
+            chamadas["lotes"].append(list(tickers))
+        compartilhado.clear()
+        time.sleep(0.01)
+        for posicao, ticker in enumerate(tickers):
+            compartilhado[ticker] = 10.0 + posicao
+        colunas = pd.MultiIndex.from_product([list(tickers), ["Close"]])
+        df = pd.DataFrame([[compartilhado.get(ticker) for ticker in tickers]], columns=colunas)
+        with lock:
+            chamadas["em_andamento"] -= 1
+        return df
+
+    monkeypatch.setitem(sys.modules, "yfinance", types.SimpleNamespace(download=download))
+    return chamadas
+
+
+def test_mais_de_um_lote_baixa_todos_os_tickers_sem_sobreposicao(carteira, monkeypatch):
+    chamadas = yfinance_falso(monkeypatch)
+    tickers = [f"ATIV{i}.SA" for i in range(120)] + ["ATIV0.SA"]
+
+    precos = carteira.obter_precos_em_lote(tickers)
+
+    assert len(precos) == 120
+    assert all(preco for preco in precos.values())
+    assert [len(lote) for lote in chamadas["lotes"]] == [50, 50, 20]
+    assert chamadas["maximo"] == 1
@@ -0,0 +1,55 @@
+from banco import consultar, executar
+from diferencas import diferenca_tabelas
+
+
+def inserir_posicao(carteira, ticker, quantidade, preco):
+    return executar(carteira.CARTEIRA_DB_PATH, '''
+        INSERT INTO carteira (ticker, nome_completo, quantidade, preco_atual, valor_total, data_adicao, tipo)
+        VALUES (?, ?, ?, ?, ?, '2024-01-02', 'Ação')
+    ''', (ticker, ticker, quantidade, preco, quantidade * preco))
+
+
+def linhas(carteira):
+    return [dict(linha) for linha in carteira.consultar_carteira()]
+
+
+def editar(carteira, anteriores, **quantidades):
+    atuais = [dict(linha, quantidade=quantidades.get(linha["ticker"], linha["quantidade"])) for linha in anteriores]
+    diferenca = diferenca_tabelas(anteriores, atuais, ['quantidade', 'tipo'], {'quantidade': float})
+    return carteira.aplicar_edicoes_carteira(diferenca.removidos, diferenca.atualizados)
+
+
+def test_quantidade_vazia_ou_invalida_e_ignorada(carteira):
+    inserir_posicao(carteira, "PETR4", 10, 30.0)
+    inserir_posicao(carteira, "VALE3", 5, 60.0)
+    anteriores = linhas(carteira)
+
+    ignoradas = editar(carteira, anteriores, PETR4="", VALE3="abc")
+
+    assert ignoradas == 2
+    assert [linha["quantidade"] for linha in linhas(carteira)] == [10, 5]
+    assert consultar(carteira.CARTEIRA_DB_PATH, "SELECT COUNT(*) FROM movimentacoes") == [(0,)]
+
+
+def test_edicao_de_quantidade_registra_movimentacao_e_historico(carteira):
+    inserir_posicao(carteira, "PETR4", 10, 30.0)
+    inserir_posicao(carteira, "VALE3", 5, 60.0)
+    anteriores = linhas(carteira)
+
+    assert editar(carteira, anteriores, PETR4="15", VALE3=2) == 0
+
+    posicoes = {linha["ticker"]: linha for linha in linhas(carteira)}
+    assert posicoes["PETR4"]["valor_total"] == 450.0
+    assert posicoes["VALE3"]["valor_total"] == 120.0
+    movimentacoes = consultar(carteira.CARTEIRA_DB_PATH, "SELECT ticker, quantidade, tipo FROM movimentacoes ORDER BY ticker")
+    assert movimentacoes == [("PETR4", 5.0, "compra"), ("VALE3", 3.0, "venda")]
+    assert consultar(carteira.CARTEIRA_DB_PATH, "SELECT valor_total FROM historico_carteira") == [(570.0,)]
+
+
+def test_remocao_registra_venda(carteira):
+    id_petr = inserir_posicao(carteira, "PETR4", 10, 30.0)
+
+    carteira.remover_ativo(id_petr)
+
+    assert linhas(carteira) == []
+    assert consultar(carteira.CARTEIRA_DB_PATH, "SELECT ticker, quantidade, tipo FROM movimentacoes") == [("PETR4", 10.0, "venda")]
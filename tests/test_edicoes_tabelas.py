@@ -0,0 +1,55 @@
+from banco import consultar, executar
+
+
+def inserir_cartoes(controle, datas):
+    return [
+        executar(controle.FINANCEIRO_DB_PATH, "INSERT INTO cartoes (nome, valor, pago, quem_usou, data) VALUES (?, ?, 'Não', 'Eu', ?)",
+                 (f"compra {i}", 10.0 + i, data))
+        for i, data in enumerate(datas)
+    ]
+
+
+def cartoes_do_mes(controle, mes, ano):
+    return [dict(linha) for linha in controle.carregar_cartoes_mes_ano(mes, ano)]
+
+
+def test_troca_de_mes_depois_de_editar_nao_apaga_nada(callbacks_da_pagina, disparo):
+    controle, callbacks = callbacks_da_pagina("pages.controle")
+    inserir_cartoes(controle, ["2024-01-05"] * 3 + ["2024-02-10"] * 6)
+    janeiro = cartoes_do_mes(controle, "01", "2024")
+    fevereiro = cartoes_do_mes(controle, "02", "2024")
+
+    # data_previous continua com o último snapshot editado (janeiro) enquanto a tabela mostra fevereiro
+    disparo("filtro-mes.value")
+    callbacks["callback_cartoes"](None, janeiro, "02", "2024", None, None, None, None, fevereiro)
+    disparo("btn-adicionar-cartao.n_clicks")
+    callbacks["callback_cartoes"](1, janeiro, "02", "2024", None, None, None, None, fevereiro)
+
+    assert consultar(controle.FINANCEIRO_DB_PATH, "SELECT COUNT(*) FROM cartoes") == [(9,)]
+
+
+def test_edicao_na_tabela_grava_a_diferenca(callbacks_da_pagina, disparo):
+    controle, callbacks = callbacks_da_pagina("pages.controle")
+    inserir_cartoes(controle, ["2024-01-05"] * 3)
+    anteriores = cartoes_do_mes(controle, "01", "2024")
+    atuais = [dict(anteriores[0], valor="99.5"), anteriores[1]]
+
+    disparo("tabela-cartoes.data_previous")
+    callbacks["callback_cartoes"](None, anteriores, "01", "2024", None, None, None, None, atuais)
+
+    assert consultar(controle.FINANCEIRO_DB_PATH, "SELECT id, valor FROM cartoes ORDER BY id") == [
+        (anteriores[0]["id"], 99.5), (anteriores[1]["id"], anteriores[1]["valor"])
+    ]
+
+
+def test_filtro_de_marmitas_depois_de_editar_nao_apaga_nada(callbacks_da_pagina, disparo):
+    marmitas, callbacks = callbacks_da_pagina("pages.marmitas")
+    for dia in ("2024-01-05", "2024-01-06", "2024-02-07"):
+        marmitas.adicionar_marmita(dia, 20.0, 1)
+    janeiro = [{"id": linha[0]} for linha in consultar(marmitas.MARMITAS_DB_PATH, "SELECT id FROM marmitas WHERE data < '2024-02-01'")]
+    fevereiro = [{"id": linha[0]} for linha in consultar(marmitas.MARMITAS_DB_PATH, "SELECT id FROM marmitas WHERE data >= '2024-02-01'")]
+
+    disparo("filtro-mes.value")
+    callbacks["gerenciar_marmitas"](0, janeiro, "02", "2024", "6m", False, None, None, None, fevereiro)
+
+    assert consultar(marmitas.MARMITAS_DB_PATH, "SELECT COUNT(*) FROM marmitas") == [(3,)]
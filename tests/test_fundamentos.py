@@ -0,0 +1,58 @@
+from banco import consultar
+
+
+INFO_PETR4 = {
+    "sector": "Energy", "longName": "Petrobras", "currentPrice": 30.0, "returnOnEquity": 0.25,
+    "dividendYield": 12.0, "averageVolume": 1000, "trailingPE": 4.0, "priceToBook": 1.1,
+}
+
+
+def yahoo_falso(monkeypatch, models, respostas):
+    # respostas: ticker -> dict de info ou exceção a levantar
+    def obter_info(ticker, limitador=None):
+        resposta = respostas[ticker]
+        if isinstance(resposta, Exception):
+            raise resposta
+        return dict(resposta)
+
+    monkeypatch.setattr(models, "obter_info", obter_info)
+
+
+def linha(models, ticker):
+    linhas = consultar(models.FUNDAMENTOS_DB_PATH, "SELECT encontrado, preco_atual FROM fundamentos WHERE ticker = ?", (ticker,))
+    return linhas[0] if linhas else None
+
+
+def test_falha_de_rede_nao_apaga_linha_existente(models, monkeypatch):
+    yahoo_falso(monkeypatch, models, {"PETR4.SA": INFO_PETR4})
+    models.atualizar_fundamentos(["PETR4.SA"], "Ação")
+    assert linha(models, "PETR4.SA") == (1, 30.0)
+
+    yahoo_falso(monkeypatch, models, {"PETR4.SA": ConnectionError("offline")})
+    assert models.atualizar_fundamentos(["PETR4.SA"], "Ação") == []
+
+    assert linha(models, "PETR4.SA") == (1, 30.0)
+    assert [d["ticker"] for d in models.carregar_fundamentos(["PETR4.SA"])] == ["PETR4.SA"]
+
+
+def test_falha_de_rede_nao_marca_ticker_novo_como_ausente(models, monkeypatch):
+    yahoo_falso(monkeypatch, models, {"VALE3.SA": TimeoutError("timeout")})
+    models.atualizar_fundamentos(["VALE3.SA"], "Ação")
+
+    assert linha(models, "VALE3.SA") is None
+    assert models.tickers_desatualizados(["VALE3.SA"]) == ["VALE3.SA"]
+
+
+def test_ticker_inexistente_vira_ausente(models, monkeypatch):
+    yahoo_falso(monkeypatch, models, {"XXXX3.SA": {}, "YYYY3.SA": {"longName": "sem setor"}})
+    models.atualizar_fundamentos(["XXXX3.SA", "YYYY3.SA"], "Ação")
+
+    assert linha(models, "XXXX3.SA") == (0, None)
+    assert linha(models, "YYYY3.SA") == (0, None)
+
+
+def test_rate_limit_esgotado_e_falha_e_nao_ausencia(models, monkeypatch):
+    yahoo_falso(monkeypatch, models, {"PETR4.SA": RuntimeError("Too Many Requests")})
+    monkeypatch.setattr(models, "calcular_backoff", lambda tentativa: 0)
+
+    assert models.buscar_informacoes_em_lote(["PETR4.SA"], "Ação") == ([], [])
@@ -0,0 +1,82 @@
+import random
+
+import pandas as pd
+import pytest
+
+from screener import filtrar_ativos
+
+
+# Filtros como eram antes do screener vetorizado: a saída nova tem que ser a mesma, na mesma ordem
+def antigo_acoes(dados, roe_min=10, dy_min=15, pl_min=1, pl_max=10, pvp_max=2):
+    return sorted([
+        ativo for ativo in dados if (
+            ativo['roe'] >= (roe_min or 0) and
+            ativo['dividend_yield'] > (dy_min or 0) and
+            (pl_min or 0) <= ativo['pl'] <= (pl_max or float('inf')) and
+            ativo['pvp'] <= (pvp_max or float('inf'))
+        )
+    ], key=lambda x: x['dividend_yield'], reverse=True)[:10]
+
+
+def antigo_fiis(dados, dy_min=10, dy_max=12, liq_min=1000_000):
+    return sorted([
+        ativo for ativo in dados if (
+            (dy_min or 0) <= ativo['dividend_yield'] <= (dy_max or float('inf')) and
+            ativo.get('liquidez_diaria', 0) > (liq_min or 0)
+        )
+    ], key=lambda x: x['dividend_yield'], reverse=True)[:10]
+
+
+def universo(semente, tamanho=400):
+    # Valores sorteados de listas pequenas para forçar empates e valores exatamente nos limites
+    aleatorio = random.Random(semente)
+    infinito = float('inf')
+    dados = []
+    for i in range(tamanho):
+        ativo = {
+            "ticker": f"T{i:04d}",
+            "roe": aleatorio.choice([-5, 0, 9.99, 10, 10.01, 15, 30, infinito]),
+            "dividend_yield": aleatorio.choice([0, 3, 3.01, 10, 11, 12, 12.01, 15, 15.5, 16, 20, 25]),
+            "pl": aleatorio.choice([-3, 0, 0.99, 1, 5, 10, 10.01, 50, infinito]),
+            "pvp": aleatorio.choice([0, 1, 2, 2.01, 3, 3.01, 10, infinito]),
+        }
+        if aleatorio.random() > 0.1:
+            ativo["liquidez_diaria"] = aleatorio.choice([0, 999_999, 1000_000, 1000_001, 5_000_000])
+        dados.append(ativo)
+    return dados
+
+
+def tickers(ativos):
+    return [ativo["ticker"] for ativo in ativos]
+
+
+@pytest.mark.parametrize("semente", range(20))
+def test_filtros_padrao_iguais_aos_antigos(models, semente):
+    dados = universo(semente)
+    assert tickers(models.aplicar_filtros_acoes(dados)) == tickers(antigo_acoes(dados))
+    assert tickers(models.aplicar_filtros_bdrs(dados)) == tickers(antigo_acoes(dados, dy_min=3, pvp_max=3))
+    assert tickers(models.aplicar_filtros_fiis(dados)) == tickers(antigo_fiis(dados))
+
+
+@pytest.mark.parametrize("semente", range(20))
+def test_filtros_da_tela_iguais_aos_antigos(models, semente):
+    dados = universo(semente)
+    aleatorio = random.Random(1000 + semente)
+    for _ in range(10):
+        acoes = [aleatorio.choice([None, 0, 5, 10]), aleatorio.choice([None, 0, 3, 10, 15]),
+                 aleatorio.choice([None, 0, 1]), aleatorio.choice([None, 0, 10, 50]),
+                 aleatorio.choice([None, 0, 2, 3])]
+        filtrados = filtrar_ativos(dados, models.predicados_acoes(*acoes))
+        assert tickers(filtrados) == tickers(antigo_acoes(dados, *acoes))
+
+        fiis = [aleatorio.choice([None, 0, 10, 11]), aleatorio.choice([None, 0, 12, 20]),
+                aleatorio.choice([None, 0, 1000_000])]
+        filtrados = filtrar_ativos(dados, models.predicados_fiis(*fiis))
+        assert tickers(filtrados) == tickers(antigo_fiis(dados, *fiis))
+
+
+def test_dataframe_da_mesmo_resultado_que_lista(models):
+    dados = universo(7)
+    df = pd.DataFrame(dados)
+    assert tickers(filtrar_ativos(df, models.FILTROS_PADRAO_ACOES)) == tickers(antigo_acoes(dados))
+    assert tickers(filtrar_ativos(df, models.FILTROS_PADRAO_FIIS)) == tickers(antigo_fiis(dados))
@@ -0,0 +1,68 @@
+from cache_respostas import CacheRespostas
+from servico_ia import ServicoIA, Trabalho, tokens_em_comum
+
+PREFIXO = "<s>[INST] Você é um assistente financeiro. Saldo do mês: R$ 1.234,56.\n\n"
+
+
+class ModeloFalso:
+    # Imita o llama_cpp 0.2.24: um token por caractere ("[INST]" vira um token especial só com
+    # special=True, como na completion) e cada chamada só avalia o que vem depois do maior início
+    # em comum com os tokens da chamada anterior (_input_ids)
+    def __init__(self):
+        self._input_ids = []
+        self.avaliados = []
+
+    def tokenize(self, texto, add_bos=True, special=False):
+        texto = texto.decode("utf-8")
+        tokens = [1] if add_bos else []
+        while texto:
+            if special and texto.startswith("[INST]"):
+                tokens.append(2)
+                texto = texto[len("[INST]"):]
+            else:
+                tokens.append(ord(texto[0]) + 10)
+                texto = texto[1:]
+        return tokens
+
+    def __call__(self, prompt, max_tokens, stream):
+        tokens = self.tokenize(prompt.encode("utf-8"), special=True)
+        comuns = tokens_em_comum(self._input_ids, tokens[:-1])
+        self.avaliados.append(len(tokens) - comuns)
+        self._input_ids = tokens + [ord("k") + 10]
+        yield {"choices": [{"text": "ok"}]}
+
+
+def servico_com_modelo():
+    servico = ServicoIA(respostas=CacheRespostas(caminho=""))
+    servico.modelo = ModeloFalso()
+    return servico
+
+
+def perguntar(servico, prefixo, pergunta):
+    prompt = prefixo + f"Pergunta do usuário: {pergunta} [/INST]"
+    trabalho = Trabalho(1, prompt, 16, prefixo, pergunta)
+    servico.executar(trabalho)
+    assert trabalho.estado == "concluido"
+    return len(servico.modelo.tokenize(prompt.encode("utf-8"), special=True))
+
+
+def test_segunda_pergunta_reaproveita_o_prefixo():
+    servico = servico_com_modelo()
+    perguntar(servico, PREFIXO, "Quanto gastei?")
+    assert servico.metricas["prefixos_avaliados"] == 1
+    assert servico.metricas["prefixos_reaproveitados"] == 0
+
+    tamanho = perguntar(servico, PREFIXO, "E no mês passado?")
+    assert servico.metricas["prefixos_reaproveitados"] == 1
+    # O modelo só processou a pergunta nova, e a métrica bate com o que ele pulou de fato
+    assert servico.modelo.avaliados[-1] <= len("Pergunta do usuário: E no mês passado? [/INST]")
+    assert servico.metricas["ultimo_tokens_reaproveitados"] == tamanho - servico.modelo.avaliados[-1]
+
+
+def test_contexto_novo_avalia_o_prefixo_de_novo():
+    servico = servico_com_modelo()
+    perguntar(servico, PREFIXO, "Quanto gastei?")
+    perguntar(servico, PREFIXO.replace("1.234,56", "9.999,99"), "Quanto gastei?")
+
+    assert servico.metricas["prefixos_avaliados"] == 2
+    assert servico.metricas["prefixos_reaproveitados"] == 0